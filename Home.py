@@ -1,13 +1,9 @@
 import streamlit as st
 import os
-from dotenv import load_dotenv
-
-load_dotenv()
-
-GOOGLE_API_KEY =st.secrets['secret_key']
+from utils.config import get_api_key
 
 def check_api_key():
-    api_key = GOOGLE_API_KEY
+    api_key = get_api_key()
     if not api_key:
         st.error("❌ Google API Key not found. Please set the GOOGLE_API_KEY environment variable.")
         st.info("💡 You can set it by adding GOOGLE_API_KEY=your_api_key to your .env file.")
@@ -1,125 +1,102 @@
-import pdfplumber
 import os
+import tempfile
 import streamlit as st
-import json
-from fpdf import FPDF
-import google.generativeai as genai
-from dotenv import load_dotenv
-
-load_dotenv()
-
-GOOGLE_API_KEY = st.secrets['secret_key']
-# Configure generative AI
-genai.configure(api_key= GOOGLE_API_KEY)
-
-class QuestionGenerator:
-    # Original QuestionGenerator class remains exactly the same
-    def __init__(self):
-        self.model = genai.GenerativeModel('gemini-1.5-flash')
-    
-    def extract_text_from_pdfs(self, pdf_files):
-        all_texts = []
-        for pdf_file in pdf_files:
-            try:
-                pdf = pdfplumber.open(pdf_file)
-                text = ""
-                for page in pdf.pages:
-                    text += page.extract_text() + "\n"
-                all_texts.append({"filename": pdf_file.name, "text": text, "pages": len(pdf.pages)})
-            except Exception as e:
-                st.error(f"Error extracting text from {pdf_file.name}: {str(e)}")
-        return all_texts
-
-    def generate_questions(self, pdf_texts, difficulty, num_mcqs, num_answers):
-        try:
-            total_questions = num_mcqs + num_answers
-            all_questions = {"mcq": [], "short_answer": []}
-            
-            total_pages = sum(pdf["pages"] for pdf in pdf_texts)
-            
-            for pdf in pdf_texts:
-                pdf_ratio = pdf["pages"] / total_pages
-                pdf_mcqs = max(1, round(num_mcqs * pdf_ratio))
-                pdf_answers = max(1, round(num_answers * pdf_ratio))
-                
-                prompt = f"""Generate questions based on the following text with:
-                        - {pdf_mcqs} Multiple Choice Questions (MCQs)
-                        - {pdf_answers} Short Answer Questions
-                        All questions should be {difficulty} level.
-                        Format the response as a JSON string with the following structure:
-                        {{
-                            "mcq": [
-                                {{
-                                    "question": "question text",
-                                    "options": ["A) option1", "B) option2", "C) option3", "D) option4"],
-                                    "correct_answer": "A"
-                                }}
-                            ],
-                            "short_answer": [
-                                {{
-                                    "question": "question text",
-                                    "answer": "brief answer (2-3 sentences)"
-                                }}
-                            ]
-                        }}
-                        Source: {pdf['filename']}"""
-                
-                response = self.model.generate_content(pdf["text"] + "\n" + prompt)
-                questions = self._parse_response(response.text)
-                
-                if questions:
-                    for q in questions["mcq"]:
-                        q["source"] = pdf["filename"]
-                    for q in questions["short_answer"]:
-                        q["source"] = pdf["filename"]
-                    
-                    all_questions["mcq"].extend(questions["mcq"])
-                    all_questions["short_answer"].extend(questions["short_answer"])
-            
-            with open('generated_questions.json', 'w') as f:
-                json.dump(all_questions, f)
-
-            return all_questions
-            
-        except Exception as e:
-            st.error(f"Error generating questions: {str(e)}")
-            return None
-
-    def _parse_response(self, response_text):
-        try:
-            cleaned_text = response_text.strip()
-            if cleaned_text.startswith("```json"):
-                cleaned_text = cleaned_text[7:-3]
-            return json.loads(cleaned_text)
-        except json.JSONDecodeError as e:
-            st.error(f"Error parsing response: {str(e)}")
-            return None
-
-def create_pdf(questions):
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_font("Arial", "B", 14)
-    
-    # Add MCQs
-    pdf.cell(0, 10, "Multiple Choice Questions", ln=True)
-    pdf.set_font("Arial", size=12)
-    
-    for i, q in enumerate(questions['mcq'], 1):
-        pdf.multi_cell(0, 10, f"{i}. {q['question']} (Source: {q['source']})")
-        for option in q['options']:
-            pdf.multi_cell(0, 10, f"   {option}")
-        pdf.ln(5)
-    
-    # Add Short Answer Questions
-    pdf.set_font("Arial", "B", 14)
-    pdf.cell(0, 10, "Short Answer Questions", ln=True)
-    pdf.set_font("Arial", size=12)
-    
-    for i, q in enumerate(questions['short_answer'], 1):
-        pdf.multi_cell(0, 10, f"{i}. {q['question']} (Source: {q['source']})")
-        pdf.ln(5)
-    
-    return pdf.output(dest='S').encode('latin-1')
+from utils.question_generator import DEFAULT_MAX_CONCURRENCY, QuestionGenerator, create_pdf
+from utils.extraction_cache import ExtractionCache
+from utils.jobs import DONE, FAILED, JobQueue, job_question_set_id, start_workers
+from utils.metrics import timed
+from utils.near_duplicates import get_question_bank
+from utils.pdf_export import export_papers
+from utils.pdf_extraction import BACKENDS, DEFAULT_BACKEND
+from utils.planning import DEFAULT_TOKEN_BUDGET, DOWNSCALE, REJECT, plan_generation
+from utils.question_store import get_question_store
+from utils.response_cache import get_response_cache
+from utils.compaction import compact_pdf_texts
+from utils.salience import select_salient_pages
+from utils.test_utils import save_questions, session_question_set_id
+from utils.variants import make_variants
+
+
+@st.cache_resource
+def get_extraction_cache():
+    # One cache per server process, shared by every session
+    return ExtractionCache()
+
+
+@st.cache_resource
+def get_job_queue():
+    # Workers start once per server process; queued jobs left over from a restart are picked up again
+    start_workers(int(os.getenv("QUESTION_JOB_WORKERS", "1")))
+    return JobQueue()
+
+
+def render_jobs():
+    job_ids = st.session_state.setdefault("job_ids", [])
+    with st.expander("🗂️ Background jobs", expanded=bool(job_ids)):
+        lookup = st.text_input("Pick up a job by ID", key="job_lookup")
+        if lookup and lookup not in job_ids and get_job_queue().get(lookup):
+            job_ids.append(lookup)
+        if not job_ids:
+            st.caption("Jobs you run in the background will appear here.")
+            return
+        st.button("🔄 Refresh status", key="refresh_jobs")
+        for job_id in job_ids:
+            job = get_job_queue().get(job_id)
+            if job is None:
+                continue
+            names = ", ".join(file_info["name"] for file_info in job["files"])
+            st.write(f"**{job_id}** · {job['status']} · {names}")
+            if job["status"] == FAILED:
+                st.error(job["error"])
+            elif job["status"] == DONE and st.button("Use these questions for my test", key=f"use_{job_id}"):
+                questions = get_question_store().load_set(job_question_set_id(job_id))
+                save_questions(questions, job["settings"]["difficulty"])
+                st.success(f"Loaded {len(questions['mcq'])} MCQs and {len(questions['short_answer'])} short answers.")
+
+
+def render_variants():
+    questions = get_question_store().load_set(session_question_set_id())
+    if not questions or not (questions["mcq"] or questions["short_answer"]):
+        return
+    with st.expander("🔀 Exam variants"):
+        st.caption("Shuffled versions of your current questions for neighbouring seats, made without calling Gemini.")
+        count = st.number_input("Number of variants", min_value=2, max_value=26, value=3, key="variant_count")
+        seed = st.number_input("Seed", min_value=0, value=0, key="variant_seed",
+                               help="The same seed always gives the same variants")
+        answer_key = st.checkbox("Include answer keys", value=True, key="variant_answer_key")
+        if st.button("Build variant papers", key="build_variants"):
+            with tempfile.TemporaryDirectory() as workdir:
+                archive = os.path.join(workdir, "variants.zip")
+                export_papers([(f"Variant {label}", variant) for label, variant in make_variants(questions, count, seed)],
+                              archive, answer_key, workers=os.cpu_count())
+                with open(archive, "rb") as f:
+                    data = f.read()
+            st.download_button("📥 Download variants (zip)", data, file_name="variants.zip",
+                               mime="application/zip", key="download_variants")
+
+
+def render_question_card(container, number, q):
+    container.markdown(f'''
+        <div class="question-card">
+            <p><strong>Q{number}.</strong> {q['question']}</p>
+            <p><em>Source: {q['source']}</em></p>
+        </div>
+    ''', unsafe_allow_html=True)
+
+
+def render_download(placeholder, questions, key, answer_key=False):
+    try:
+        pdf_bytes = create_pdf(questions, answer_key)
+        placeholder.download_button(
+            label="📥 Download Questions PDF",
+            data=pdf_bytes,
+            file_name="generated_questions.pdf",
+            mime="application/pdf",
+            key=key,
+            help="Download the generated questions as a PDF file"
+        )
+    except Exception as e:
+        placeholder.error(f"Error creating PDF: {str(e)}")
 
 def main():
     st.set_page_config(page_title="Question Generator", page_icon="📝", layout="wide")
@@ -226,6 +203,37 @@ def main():
         difficulty = st.selectbox("Select difficulty", ["Simple", "Medium", "Hard"], key="difficulty_select")
         num_mcqs = st.number_input("Number of MCQs", min_value=1, max_value=10, value=1, key="mcq_input")
         num_answers = st.number_input("Number of short answers", min_value=1, max_value=10, value=1, key="answer_input")
+        extraction_workers = st.number_input("PDF extraction workers", min_value=1, max_value=os.cpu_count() or 1,
+                                             value=1, key="workers_input",
+                                             help="Pages are split across this many processes while reading PDFs")
+        max_concurrency = st.number_input("Parallel Gemini requests", min_value=1, max_value=16,
+                                          value=DEFAULT_MAX_CONCURRENCY, key="concurrency_input",
+                                          help="How many PDFs are sent to Gemini at the same time")
+        prompt_budget = st.number_input("Prompt token budget per PDF (0 = send everything)", min_value=0,
+                                        value=0, step=1000, key="budget_input",
+                                        help="Only the most salient pages of each PDF are sent, up to this many tokens")
+        compact_text = st.checkbox("Strip headers, footers and layout noise", value=True, key="compact_checkbox",
+                                   help="Repeated page headers and footers, page numbers, hyphen breaks and extra spaces are removed before prompting")
+        drop_references = st.checkbox("Drop reference lists", value=False, key="references_checkbox",
+                                      disabled=not compact_text,
+                                      help="Leaves out everything from a References or Bibliography heading up to any appendix")
+        token_budget = st.number_input("Token budget for this job (0 = no limit)", min_value=0,
+                                       value=DEFAULT_TOKEN_BUDGET, step=10000, key="job_budget_input",
+                                       help="Estimated before any Gemini call is made")
+        over_budget = st.selectbox("When over budget", [DOWNSCALE, REJECT], key="over_budget_select",
+                                   format_func={DOWNSCALE: "Send only the key pages", REJECT: "Don't generate"}.get)
+        use_response_cache = st.checkbox("Reuse cached Gemini responses", value=True, key="cache_checkbox",
+                                         help="Untick to force fresh questions for a PDF you have generated from before")
+        avoid_repeats = st.checkbox("Avoid repeating earlier questions", value=True, key="bank_checkbox",
+                                    help="Near-copies of questions generated before are dropped and replaced")
+        run_in_background = st.checkbox("Run in background", value=False, key="background_checkbox",
+                                        help="Queue the job and pick up the questions later, even after closing the tab")
+        include_answer_key = st.checkbox("Include answer key in PDF", value=False, key="answer_key_checkbox",
+                                         help="Adds a last page with the correct answers to the downloaded PDF")
+        backend_names = list(BACKENDS)
+        extraction_backend = st.selectbox("PDF text engine", backend_names, index=backend_names.index(DEFAULT_BACKEND),
+                                          key="backend_select",
+                                          help="'auto' reads plain text layers with PyPDF2 and falls back to pdfplumber for complex pages")
         
         st.markdown(f'''
             <div style="text-align: center; padding: 1rem; background: linear-gradient(90deg, #3b82f6 0%, #2563eb 100%); border-radius: 8px; margin-top: 1rem;">
@@ -243,54 +251,86 @@ def main():
     if uploaded_files:
         st.write(f"📚 Uploaded {len(uploaded_files)} PDF(s)")
         
-        if st.button("🚀 Generate Questions"):
+        generate_clicked = st.button("🚀 Generate Questions")
+        if generate_clicked and run_in_background:
+            job_id = get_job_queue().submit(uploaded_files, {
+                "difficulty": difficulty, "num_mcqs": num_mcqs, "num_answers": num_answers,
+                "max_concurrency": max_concurrency, "prompt_budget": prompt_budget, "use_cache": use_response_cache,
+                "avoid_repeats": avoid_repeats, "backend": extraction_backend,
+                "token_budget": token_budget, "over_budget": over_budget,
+                "compact_text": compact_text, "drop_references": drop_references,
+            })
+            if job_id not in st.session_state.setdefault("job_ids", []):
+                st.session_state["job_ids"].append(job_id)
+            st.success(f"Queued job {job_id}. Keep this ID to pick up the questions later.")
+        elif generate_clicked:
             with st.spinner("Generating questions..."):
-                generator = QuestionGenerator()
-                pdf_texts = generator.extract_text_from_pdfs(uploaded_files)
+                extraction_cache = get_extraction_cache()
+                generator = QuestionGenerator(extraction_cache=extraction_cache, response_cache=get_response_cache())
+                pdf_texts = generator.extract_text_from_pdfs(uploaded_files, workers=extraction_workers,
+                                                             backend=extraction_backend)
+                cache_stats = extraction_cache.stats()
+                st.caption(f"Extraction cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses")
+
+                if pdf_texts and compact_text:
+                    pdf_texts = compact_pdf_texts(pdf_texts, drop_references)
+                    st.caption("Tokens removed: " + ", ".join(f"{pdf['filename']} {pdf['tokens_removed']:,}"
+                                                              for pdf in pdf_texts))
                 
+                if pdf_texts and prompt_budget:
+                    with timed("select_pages"):
+                        pdf_texts = select_salient_pages(pdf_texts, prompt_budget)
+
+                plan = None
                 if pdf_texts:
-                    questions = generator.generate_questions(pdf_texts, difficulty, num_mcqs, num_answers)
-                    
-                    if questions:
-                        st.markdown('<div class="generated-questions">', unsafe_allow_html=True)
-                        st.subheader("📝 Generated Questions")
-                        
-                        # MCQs section
-                        st.write("### Multiple Choice Questions")
-                        for i, q in enumerate(questions['mcq'], 1):
-                            st.markdown(f'''
-                                <div class="question-card">
-                                    <p><strong>Q{i}.</strong> {q['question']}</p>
-                                    <p><em>Source: {q['source']}</em></p>
-                                </div>
-                            ''', unsafe_allow_html=True)
-                        
-                        # Short Answer section
-                        st.write("### Short Answer Questions")
-                        for i, q in enumerate(questions['short_answer'], 1):
-                            st.markdown(f'''
-                                <div class="question-card">
-                                    <p><strong>Q{i}.</strong> {q['question']}</p>
-                                    <p><em>Source: {q['source']}</em></p>
-                                </div>
-                            ''', unsafe_allow_html=True)
-                        st.markdown('</div>', unsafe_allow_html=True)
-                        
-                        # Download button
-                        try:
-                            pdf_bytes = create_pdf(questions)
-                            st.download_button(
-                                label="📥 Download Questions PDF",
-                                data=pdf_bytes,
-                                file_name="generated_questions.pdf",
-                                mime="application/pdf",
-                                key="download_pdf",
-                                help="Download the generated questions as a PDF file"
-                            )
-                        except Exception as e:
-                            st.error(f"Error creating PDF: {str(e)}")
+                    try:
+                        plan = plan_generation(pdf_texts, num_mcqs, num_answers, token_budget=token_budget,
+                                               over_budget=over_budget)
+                        st.caption(f"Plan: {len(plan.requests)} Gemini request(s), about {plan.total_tokens:,} tokens"
+                                   + (" after trimming to key pages" if plan.downscaled else ""))
+                    except ValueError as e:
+                        st.error(str(e))
+
+                if plan:
+                    st.markdown('<div class="generated-questions">', unsafe_allow_html=True)
+                    st.subheader("📝 Generated Questions")
+                    download = st.empty()
+                    st.write("### Multiple Choice Questions")
+                    mcq_cards = st.container()
+                    st.write("### Short Answer Questions")
+                    answer_cards = st.container()
+                    st.markdown('</div>', unsafe_allow_html=True)
+
+                    # Cards are appended as each chunk finishes; the download covers whatever is ready
+                    questions = {"mcq": [], "short_answer": []}
+                    try:
+                        with timed("generate_questions", files=len(pdf_texts)):
+                            for batch_number, batch in enumerate(generator.iter_questions(
+                                pdf_texts, difficulty, num_mcqs, num_answers,
+                                max_concurrency=max_concurrency, use_cache=use_response_cache,
+                                question_bank=get_question_bank() if avoid_repeats else None,
+                                token_budget=token_budget, plan=plan,
+                            )):
+                                for q in batch["mcq"]:
+                                    questions["mcq"].append(q)
+                                    render_question_card(mcq_cards, len(questions["mcq"]), q)
+                                for q in batch["short_answer"]:
+                                    questions["short_answer"].append(q)
+                                    render_question_card(answer_cards, len(questions["short_answer"]), q)
+                                render_download(download, questions, key=f"download_pdf_{batch_number}",
+                                                answer_key=include_answer_key)
+                        save_questions(questions, difficulty)
+                    except Exception as e:
+                        st.error(f"Error generating questions: {str(e)}")
+
+                    response_stats = get_response_cache().stats()
+                    st.caption(f"Response cache hit rate: {response_stats['hit_rate']:.0%} "
+                               f"({response_stats['hits']} hits, {response_stats['misses']} misses)")
     else:
         st.info("👆 Please upload one or more PDF files to begin.")
 
+    render_variants()
+    render_jobs()
+
 if __name__ == "__main__":
     main()
@@ -1,7 +1,90 @@
+import hashlib
 import streamlit as st
-from utils.test_utils import load_questions, compare_answers
+from utils.test_utils import load_questions, iter_grades
 import json
 
+def total_score_html(total_score, graded_questions, ungraded_questions=0):
+    # Answers that could not be graded count neither for nor against the total
+    note = f'<p>{ungraded_questions} answer(s) not graded</p>' if ungraded_questions else ''
+    return (
+        f'<div class="score-display">'
+        f'<h2>Total Score</h2>'
+        f'<h1>{total_score}/{graded_questions * 10}</h1>'
+        f'{note}'
+        f'</div>'
+    )
+
+def score_text(result):
+    return "Score: not graded" if result["score"] is None else f"Score: {result['score']}/10"
+
+def render_result(container, q_type, q_num, result):
+    container.markdown(f'<div class="result-card">', unsafe_allow_html=True)
+    container.subheader(f"{q_type} {q_num}")
+    container.markdown(f'<div class="score-display">{score_text(result)}</div>', unsafe_allow_html=True)
+
+    container.markdown('<div class="feedback-item">', unsafe_allow_html=True)
+    container.write("✅ Correct:")
+    container.write(result['feedback']['correct'])
+    container.markdown('</div>', unsafe_allow_html=True)
+
+    container.markdown('<div class="feedback-item">', unsafe_allow_html=True)
+    container.write("❌ Incorrect:")
+    container.write(result['feedback']['incorrect'])
+    container.markdown('</div>', unsafe_allow_html=True)
+
+    container.markdown('<div class="feedback-item">', unsafe_allow_html=True)
+    container.write("💡 Suggestions:")
+    container.write(result['feedback']['suggestions'])
+    container.markdown('</div>', unsafe_allow_html=True)
+
+    container.markdown('</div>', unsafe_allow_html=True)
+
+def store_answer(widget_key, q_type, index):
+    # Only answered questions are kept: {"mcq": {index: option index}, "short_answer": {index: text}}
+    value = st.session_state.get(widget_key)
+    answers = st.session_state["answers"][q_type]
+    if value is None or value == "":
+        answers.pop(index, None)
+    else:
+        answers[index] = value
+
+def go_to_section(section):
+    st.session_state["test_section"] = section
+
+@st.fragment
+def render_section(items, set_tag, per_section):
+    # Runs on its own when one of its widgets changes, so a click costs one section, not the whole test
+    answers = st.session_state["answers"]
+    sections = max(1, -(-len(items) // per_section))
+    section = min(st.session_state.get("test_section", 0), sections - 1)
+
+    for number, q_type, i, q in items[section * per_section:(section + 1) * per_section]:
+        widget_key = f"{q_type}_{set_tag}_{i}"
+        st.markdown(f'<div class="question-card">', unsafe_allow_html=True)
+        st.markdown(f'<div class="question-number">Question {number}</div>', unsafe_allow_html=True)
+        st.subheader(q['question'])
+        if q_type == "mcq":
+            st.radio(
+                "Select your answer:", range(len(q['options'])), format_func=q['options'].__getitem__,
+                index=answers["mcq"].get(i), key=widget_key, on_change=store_answer, args=(widget_key, "mcq", i)
+            )
+        else:
+            st.text_area(
+                "Your answer:", value=answers["short_answer"].get(i, ""), key=widget_key, height=150,
+                on_change=store_answer, args=(widget_key, "short_answer", i)
+            )
+        st.markdown('</div>', unsafe_allow_html=True)
+
+    if sections > 1:
+        previous_col, status_col, next_col = st.columns([1, 2, 1])
+        previous_col.button("← Previous", disabled=section == 0, key="section_previous",
+                            on_click=go_to_section, args=(section - 1,))
+        next_col.button("Next →", disabled=section == sections - 1, key="section_next",
+                        on_click=go_to_section, args=(section + 1,))
+        status_col.caption(f"Section {section + 1} of {sections}")
+    answered = len(answers["mcq"]) + len(answers["short_answer"])
+    st.caption(f"Answered {answered} of {len(items)} questions")
+
 def main():
     st.set_page_config(page_title="Automated Assessment", page_icon="💡", layout="wide")
 
@@ -126,99 +209,74 @@ def main():
     total_sa_questions = len(questions['short_answer'])
     total_questions = total_mcq_questions + total_sa_questions
 
-    # Ensure answers are initialized before accessing
-    if "answers" not in st.session_state:
-        st.session_state["answers"] = {
-            "mcq": [None] * total_mcq_questions,
-            "short_answer": [None] * total_sa_questions
-        }
+    # Answers belong to one question set; a newly generated set starts empty
+    set_tag = hashlib.sha1("\0".join(q['question'] for q in questions['mcq'] + questions['short_answer'])
+                           .encode("utf-8")).hexdigest()[:8]
+    if st.session_state.get("answers_set") != set_tag:
+        st.session_state["answers_set"] = set_tag
+        st.session_state["answers"] = {"mcq": {}, "short_answer": {}}
+        st.session_state["test_section"] = 0
 
     # Main content and sidebar layout
     col1, col2 = st.columns([2, 1])
+    st.sidebar.title("Test Results")
+    graded_now = False
 
     with col1:
-        # MCQ Questions
-        mcq_answers = [None] * total_mcq_questions
-        for i, q in enumerate(questions['mcq'], 1):
-            st.markdown(f'<div class="question-card">', unsafe_allow_html=True)
-            st.markdown(f'<div class="question-number">Question {i}</div>', unsafe_allow_html=True)
-            st.subheader(q['question'])
-            mcq_answers[i - 1] = st.radio(
-                "Select your answer:", q['options'], key=f"mcq_{i}"
-            )
-            st.markdown('</div>', unsafe_allow_html=True)
-
-        # Short Answer Questions
-        sa_answers = [None] * total_sa_questions
-        for i, q in enumerate(questions['short_answer'], 1):
-            st.markdown(f'<div class="question-card">', unsafe_allow_html=True)
-            st.markdown(f'<div class="question-number">Question {total_mcq_questions + i}</div>', unsafe_allow_html=True)
-            st.subheader(q['question'])
-            sa_answers[i - 1] = st.text_area(
-                "Your answer:", key=f"sa_{i}", height=150
-            )
-            st.markdown('</div>', unsafe_allow_html=True)
-
-        # Update session state answers after all inputs are collected
-        st.session_state["answers"]["mcq"] = mcq_answers
-        st.session_state["answers"]["short_answer"] = sa_answers
+        per_section = st.selectbox("Questions per section", [5, 10, 20, 50], index=1, key="section_size")
+        items = [(i + 1, "mcq", i, q) for i, q in enumerate(questions['mcq'])]
+        items += [(total_mcq_questions + i + 1, "short_answer", i, q) for i, q in enumerate(questions['short_answer'])]
+        render_section(items, set_tag, per_section)
 
         if st.button("Submit Quiz", help="Click to submit all your answers"):
             with st.spinner("Evaluating your answers..."):
-                results = []
-                
-                # Evaluate all answers
-                for i, q in enumerate(questions['mcq'], 1):
-                    user_answer = st.session_state["answers"]["mcq"][i - 1]
-                    result = compare_answers(q['question'], q['correct_answer'], user_answer)
-                    total_score += result['score']
-                    results.append(("MCQ", i, result))
-
-                for i, q in enumerate(questions['short_answer'], 1):
-                    user_answer = st.session_state["answers"]["short_answer"][i - 1]
-                    result = compare_answers(q['question'], q['answer'], user_answer)
-                    total_score += result['score']
-                    results.append(("Short Answer", i, result))
+                answers = st.session_state["answers"]
+                entries = [("mcq", q, q['options'][answers["mcq"][i]] if i in answers["mcq"] else None)
+                           for i, q in enumerate(questions['mcq'])]
+                entries += [("short_answer", q, answers["short_answer"].get(i))
+                            for i, q in enumerate(questions['short_answer'])]
+
+                def label(i):
+                    return ("MCQ", i + 1) if i < total_mcq_questions else ("Short Answer", i - total_mcq_questions + 1)
+
+                # MCQs are graded locally; open short answers go to Gemini in concurrent batches
+                # and each grade is shown in the sidebar as soon as it arrives
+                total_display = st.sidebar.empty()
+                progress = st.sidebar.progress(0.0, text="Grading your answers...")
+                live_results = st.sidebar.container()
+                grades = [None] * len(entries)
+                for done, (i, result) in enumerate(iter_grades(entries), 1):
+                    grades[i] = result
+                    render_result(live_results, *label(i), result)
+                    progress.progress(done / max(1, len(entries)), text=f"Graded {done} of {len(entries)}")
+
+                results = [("MCQ", i, result) for i, result in enumerate(grades[:total_mcq_questions], 1)]
+                results += [("Short Answer", i, result) for i, result in enumerate(grades[total_mcq_questions:], 1)]
+                scored = [result['score'] for result in grades if result['score'] is not None]
+                total_score += sum(scored)
 
                 st.session_state["quiz_results"] = results
                 st.session_state["total_score"] = total_score
-                st.session_state["total_questions"] = total_questions
+                st.session_state["total_questions"] = len(scored)
+                st.session_state["ungraded_questions"] = total_questions - len(scored)
+                total_display.markdown(total_score_html(total_score, len(scored), total_questions - len(scored)),
+                                       unsafe_allow_html=True)
+                progress.empty()
+                graded_now = True
 
     with col2:
-        st.sidebar.title("Test Results")
-        
-        if "quiz_results" in st.session_state:
+        # Results graded on this run were already drawn live by the submit handler
+        if "quiz_results" in st.session_state and not graded_now:
             # Total score display
             st.sidebar.markdown(
-                f'<div class="score-display">'
-                f'<h2>Total Score</h2>'
-                f'<h1>{st.session_state["total_score"]}/{st.session_state["total_questions"] * 10}</h1>'
-                f'</div>',
+                total_score_html(st.session_state["total_score"], st.session_state["total_questions"],
+                                 st.session_state.get("ungraded_questions", 0)),
                 unsafe_allow_html=True
             )
             
             # Individual results
             for q_type, q_num, result in st.session_state["quiz_results"]:
-                st.sidebar.markdown(f'<div class="result-card">', unsafe_allow_html=True)
-                st.sidebar.subheader(f"{q_type} {q_num}")
-                st.sidebar.markdown(f'<div class="score-display">Score: {result["score"]}/10</div>', unsafe_allow_html=True)
-                
-                st.sidebar.markdown('<div class="feedback-item">', unsafe_allow_html=True)
-                st.sidebar.write("✅ Correct:")
-                st.sidebar.write(result['feedback']['correct'])
-                st.sidebar.markdown('</div>', unsafe_allow_html=True)
-                
-                st.sidebar.markdown('<div class="feedback-item">', unsafe_allow_html=True)
-                st.sidebar.write("❌ Incorrect:")
-                st.sidebar.write(result['feedback']['incorrect'])
-                st.sidebar.markdown('</div>', unsafe_allow_html=True)
-                
-                st.sidebar.markdown('<div class="feedback-item">', unsafe_allow_html=True)
-                st.sidebar.write("💡 Suggestions:")
-                st.sidebar.write(result['feedback']['suggestions'])
-                st.sidebar.markdown('</div>', unsafe_allow_html=True)
-                
-                st.sidebar.markdown('</div>', unsafe_allow_html=True)
+                render_result(st.sidebar, q_type, q_num, result)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
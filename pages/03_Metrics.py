@@ -0,0 +1,40 @@
+import os
+import streamlit as st
+from utils.metrics import get_metrics
+
+
+def main():
+    st.set_page_config(page_title="Metrics", page_icon="📊", layout="wide")
+    st.title("📊 Performance Metrics")
+
+    # Admin only: stage timings cover every session on this server
+    if os.getenv("QUESTION_GENERATOR_ADMIN", "").lower() not in ("1", "true", "yes"):
+        st.info("This panel is turned off. Set QUESTION_GENERATOR_ADMIN=1 on the server to enable it.")
+        st.stop()
+
+    metrics = get_metrics()
+    st.button("🔄 Refresh")
+
+    st.subheader("Stages")
+    rows = metrics.stage_summary()
+    if rows:
+        st.dataframe(rows, use_container_width=True)
+        st.caption("Percentiles cover the most recent samples of each stage, in seconds.")
+    else:
+        st.caption("Nothing has been timed yet in this server process.")
+
+    st.subheader("Tokens, cost, retries and caches")
+    counters = metrics.counters()
+    if counters:
+        st.dataframe(counters, use_container_width=True)
+    else:
+        st.caption("No Gemini calls or cache lookups yet.")
+
+    st.download_button("⬇️ Prometheus metrics", metrics.prometheus_text(), file_name="metrics.txt", mime="text/plain")
+    if st.button("Reset metrics"):
+        metrics.reset()
+        st.rerun()
+
+
+if __name__ == "__main__":
+    main()
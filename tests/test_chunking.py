@@ -0,0 +1,18 @@
+from utils.chunking import CHARS_PER_TOKEN, chunk_pages
+
+
+def test_pages_are_grouped_up_to_the_budget():
+    pages = ["a" * 15, "b" * 15, "c" * 15]
+    assert chunk_pages(pages, max_tokens=8) == ["a" * 15 + "\n" + "b" * 15, "c" * 15]
+
+
+def test_oversized_page_is_cut_into_budget_slices():
+    max_chars = 10 * CHARS_PER_TOKEN
+    big = "x" * (2 * max_chars + 5)
+    chunks = chunk_pages(["small", big, "tail"], max_tokens=10)
+    assert chunks == ["small", "x" * max_chars, "x" * max_chars, "x" * 5, "tail"]
+    assert all(len(chunk) <= max_chars for chunk in chunks)
+
+
+def test_blank_pages_make_no_chunks():
+    assert chunk_pages(["", "  \n"], max_tokens=10) == []
@@ -0,0 +1,45 @@
+from utils.compaction import compact_pages, compact_pdf_texts
+
+
+def book(pages=8):
+    texts = []
+    for k in range(1, pages + 1):
+        body = f"Section {k} covers topic number {k * 7}.\nThe mito-\nchondria produce   energy for cell {k}.\n\n\n\nMore on page {k}."
+        texts.append(f"Journal of Cell Biology Vol. 12\n{10 + k} Chapter 2: Cells\n{body}\n{k}\n© 2024 Publisher Inc.")
+    return texts
+
+
+def test_running_headers_footers_and_page_numbers_are_removed():
+    page = compact_pages(book())[0]
+    assert page == ("Section 1 covers topic number 7.\nThe mitochondria produce energy for cell 1.\n\n"
+                    "More on page 1.")
+
+
+def test_edge_body_lines_differing_only_in_numbers_are_kept():
+    pages = [f"Body line {k} about topic {k * 7}. Mito-\nchondria make energy {k}.\nMiddle {k}.\nEnd of page {k} text."
+             for k in range(1, 7)]
+    compacted = compact_pages(pages)
+    assert compacted[0] == "Body line 1 about topic 7. Mitochondria make energy 1.\nMiddle 1.\nEnd of page 1 text."
+
+
+def test_reference_list_ends_at_next_chapter():
+    pages = ["Chapter 1\nText one.\nReferences\n[1] Foo", "Chapter 2\nImportant text two.", "Chapter 3\nMore text."]
+    compacted = compact_pages(pages, drop_references=True)
+    assert "[1] Foo" not in "\n".join(compacted)
+    assert "Text one." in compacted[0]
+    assert "Important text two." in compacted[1]
+    assert "More text." in compacted[2]
+
+
+def test_reference_list_continues_over_citation_pages():
+    pages = ["Text one.\nBibliography\nSmith, J. (2001). Cells.", "Doe, A. (2003). More cells.", "Next part without citations."]
+    assert compact_pages(pages, drop_references=True) == ["Text one.", "", "Next part without citations."]
+
+
+def test_compact_pdf_texts_reports_tokens_removed():
+    pages = book()
+    pdf = {"filename": "a.pdf", "text": "\n".join(pages) + "\n", "pages": len(pages), "page_texts": pages}
+    compacted = compact_pdf_texts([pdf])[0]
+    assert compacted["tokens_removed"] > 0
+    assert compacted["page_texts"] == compact_pages(pages)
+    assert compacted["filename"] == "a.pdf"
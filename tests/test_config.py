@@ -0,0 +1,22 @@
+from utils import config
+
+
+def test_missing_key_is_not_cached(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("GOOGLE_API_KEY", raising=False)
+    monkeypatch.setattr(config, "_from_streamlit_secrets", lambda: None)
+    monkeypatch.setattr(config, "_resolved_keys", {})
+    assert config.get_api_key() is None
+    monkeypatch.setenv("GOOGLE_API_KEY", "later")
+    assert config.get_api_key() == "later"
+    monkeypatch.setenv("GOOGLE_API_KEY", "changed")
+    assert config.get_api_key() == "later"
+
+
+def test_key_from_toml_config(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("GOOGLE_API_KEY", raising=False)
+    monkeypatch.setattr(config, "_resolved_keys", {})
+    path = tmp_path / "config.toml"
+    path.write_text('secret_key = "from-file"\n')
+    assert config.get_api_key(str(path)) == "from-file"
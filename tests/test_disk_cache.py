@@ -0,0 +1,37 @@
+from utils import disk_cache
+from utils.disk_cache import DiskCache
+
+
+def test_evicts_least_recently_used_over_the_size_cap(tmp_path, monkeypatch):
+    clock = iter(range(100))
+    monkeypatch.setattr(disk_cache, "_now", lambda: next(clock))
+    # Each "xxxxxxxx" entry is 10 bytes of JSON, so three fit
+    cache = DiskCache(str(tmp_path / "cache.sqlite3"), max_bytes=30)
+    for key in ("a", "b", "c"):
+        cache.put_key(key, "x" * 8)
+    assert cache.get_key("a") == "x" * 8
+    cache.put_key("d", "x" * 8)
+    assert cache.get_key("b") is None
+    assert [cache.get_key(key) for key in ("a", "c", "d")] == ["x" * 8] * 3
+    assert cache.stats()["size_bytes"] == 30
+
+
+def test_skips_values_larger_than_the_cap(tmp_path):
+    cache = DiskCache(str(tmp_path / "cache.sqlite3"), max_bytes=10)
+    cache.put_key("big", "x" * 20)
+    assert cache.get_key("big") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_entries_expire_after_the_ttl(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(disk_cache, "_now", lambda: now[0])
+    cache = DiskCache(str(tmp_path / "cache.sqlite3"), max_bytes=1000, ttl=60)
+    cache.put_key("k", {"v": 1})
+    now[0] += 30
+    assert cache.get_key("k") == {"v": 1}
+    # Reading does not extend the lifetime; expiry counts from when the entry was written
+    now[0] += 31
+    assert cache.get_key("k") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 0)
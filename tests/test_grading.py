@@ -0,0 +1,69 @@
+import json
+from utils import test_utils
+from utils.test_utils import _parse_batch_grades, iter_grades, grade_mcq, grade_short_answer_locally
+
+FEEDBACK = {"correct": "Right idea.", "incorrect": "Missed a detail.", "suggestions": "Add an example."}
+
+
+def test_parse_batch_grades_accepts_valid_grades():
+    text = "```json\n" + json.dumps([{"id": 0, "score": 7, **FEEDBACK}, {"id": 1, "score": "3", **FEEDBACK}]) + "```"
+    results = _parse_batch_grades(text, {0, 1})
+    assert results[0]["score"] == 7
+    assert results[1]["score"] == 3
+    assert _parse_batch_grades(json.dumps([{"id": 0, "score": 7.0, **FEEDBACK}]), {0})[0]["score"] == 7
+    assert results[0]["feedback"]["correct"] == "Right idea."
+
+
+def test_parse_batch_grades_normalizes_string_ids():
+    text = json.dumps({"results": [{"id": "2", "score": 9, **FEEDBACK}]})
+    assert list(_parse_batch_grades(text, {2})) == [2]
+
+
+def test_parse_batch_grades_rejects_bad_items():
+    text = json.dumps([
+        {"id": 0, "score": True, **FEEDBACK},
+        {"id": 1, "score": 11, **FEEDBACK},
+        {"id": 3, "score": 7.9, **FEEDBACK},
+        {"id": 4, "score": "7.9", **FEEDBACK},
+        {"id": 2, "score": 5, "correct": "Only one field"},
+        {"id": 9, "score": 5, **FEEDBACK},
+    ])
+    assert _parse_batch_grades(text, {0, 1, 2, 3, 4}) == {}
+    assert _parse_batch_grades("not json", {0}) == {}
+
+
+def test_local_grading():
+    question = {"options": ["A) Mitochondria", "B) Nucleus", "C) Ribosome", "D) Golgi"], "correct_answer": "A"}
+    assert grade_mcq(question, "A) Mitochondria")["score"] == 10
+    assert grade_mcq(question, "B) Nucleus")["score"] == 0
+    assert grade_short_answer_locally("The unit of life.", "the unit of life")["score"] == 10
+    assert grade_short_answer_locally("The unit of life.", "")["score"] == 0
+    assert grade_short_answer_locally("The unit of life.", "A cell") is None
+
+
+def test_ungraded_answers_have_no_score(monkeypatch):
+    monkeypatch.setattr(test_utils, "_grade_batch", lambda items, use_cache=True: ({}, None))
+    entries = [("short_answer", {"question": "What is a cell?", "answer": "The unit of life."}, "A cell")]
+    [(index, result)] = list(iter_grades(entries))
+    assert index == 0
+    assert result["score"] is None
+
+
+def test_iter_grades_sends_only_open_answers_to_the_model(monkeypatch):
+    batches = []
+
+    def grade_batch(items, use_cache=True):
+        batches.append([user_answer for _, _, user_answer in items])
+        return {k: {"score": len(user_answer), "feedback": FEEDBACK} for k, (_, _, user_answer) in enumerate(items)}, None
+
+    monkeypatch.setattr(test_utils, "_grade_batch", grade_batch)
+    mcq = {"question": "What makes ATP?", "options": ["A) Mitochondria", "B) Nucleus"], "correct_answer": "A"}
+    short = {"question": "What is a cell?", "answer": "The unit of life."}
+    entries = [("mcq", mcq, "A) Mitochondria"), ("short_answer", short, "x"), ("short_answer", short, ""),
+               ("short_answer", short, "The unit of life"), ("short_answer", short, "xxx"), ("short_answer", short, "xxxxx")]
+    grades = list(iter_grades(entries, batch_size=2, max_workers=1))
+
+    # Local grades come first, then each remote answer gets the grade for its own position in its batch
+    assert [i for i, _ in grades[:3]] == [0, 2, 3]
+    assert {i: result["score"] for i, result in grades} == {0: 10, 1: 1, 2: 0, 3: 10, 4: 3, 5: 5}
+    assert sorted(batches) == [["x", "xxx"], ["xxxxx"]]
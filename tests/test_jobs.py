@@ -0,0 +1,57 @@
+import os
+import time
+import pytest
+from utils import jobs, llm_gateway, question_store, response_cache
+from utils.benchmark import synthetic_pdf
+from utils.fake_gemini import FakeGenerativeModel, use_fake_gemini
+from utils.jobs import RUNNING, JobFile, JobQueue, job_question_set_id, process_job
+
+
+def make_queue(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"), str(tmp_path / "files"))
+    job_id = queue.submit([JobFile(b"%PDF-1.4", "a.pdf")], {"num_mcqs": 1})
+    return queue, job_id
+
+
+def test_running_job_with_heartbeat_is_not_reclaimed(tmp_path, monkeypatch):
+    queue, job_id = make_queue(tmp_path)
+    assert queue.claim(os.getpid())["job_id"] == job_id
+    clock = time.time()
+    monkeypatch.setattr(jobs, "_now", lambda: clock + jobs.STALE_AFTER - 1)
+    queue.heartbeat(job_id, os.getpid())
+    monkeypatch.setattr(jobs, "_now", lambda: clock + 2 * jobs.STALE_AFTER - 2)
+    assert queue.claim(os.getpid() + 1) is None
+
+
+def test_silent_running_job_is_reclaimed(tmp_path, monkeypatch):
+    queue, job_id = make_queue(tmp_path)
+    queue.claim(os.getpid())
+    clock = time.time()
+    monkeypatch.setattr(jobs, "_now", lambda: clock + jobs.STALE_AFTER + 1)
+    job = queue.claim(12345)
+    assert job["job_id"] == job_id and job["status"] == RUNNING
+
+
+def run_job(tmp_path, monkeypatch, fake):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("GOOGLE_API_KEY", "offline")
+    monkeypatch.setattr(llm_gateway, "BACKOFF_MAX", 0)
+    monkeypatch.setattr(response_cache, "_default_cache", None)
+    monkeypatch.setattr(question_store, "_default_store", None)
+    queue = JobQueue("jobs.sqlite3", "files")
+    settings = {"difficulty": "Medium", "num_mcqs": 2, "num_answers": 1, "max_concurrency": 2, "prompt_budget": 0,
+                "use_cache": False, "avoid_repeats": False, "backend": "auto"}
+    job = queue.get(queue.submit([JobFile(synthetic_pdf(2), "a.pdf")], settings))
+    with use_fake_gemini(fake, requests_per_minute=10 ** 9, tokens_per_minute=10 ** 12, max_retries=1):
+        process_job(queue, job)
+    return question_store.get_question_store().load_set(job_question_set_id(job["job_id"]))
+
+
+def test_job_saves_generated_questions(tmp_path, monkeypatch):
+    questions = run_job(tmp_path, monkeypatch, FakeGenerativeModel(latency=0))
+    assert (len(questions["mcq"]), len(questions["short_answer"])) == (2, 1)
+
+
+def test_job_without_questions_fails_with_the_errors(tmp_path, monkeypatch):
+    with pytest.raises(ValueError, match="Only 0 of 2 MCQs.*Error generating questions for a.pdf"):
+        run_job(tmp_path, monkeypatch, FakeGenerativeModel(latency=0, error_rate=1.0))
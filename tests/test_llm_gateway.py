@@ -0,0 +1,24 @@
+import threading
+import pytest
+from utils.fake_gemini import FakeGenerativeModel
+from utils import llm_gateway
+from utils.llm_gateway import LLMGateway, TokenBucket
+
+
+def test_token_bucket_rejects_non_positive_rates():
+    for rate in (0, -5):
+        with pytest.raises(ValueError):
+            TokenBucket(rate)
+
+
+def test_retries_are_counted_across_threads(monkeypatch):
+    monkeypatch.setattr(llm_gateway, "BACKOFF_MAX", 0)
+    fake = FakeGenerativeModel(latency=0, error_rate=0.5, seed=1)
+    gateway = LLMGateway(requests_per_minute=10 ** 9, tokens_per_minute=10 ** 12, max_retries=50, model=fake)
+    threads = [threading.Thread(target=lambda: [gateway.generate_content("Generate questions") for _ in range(20)])
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert gateway.retries == fake.errors
@@ -0,0 +1,53 @@
+import random
+import sqlite3
+import numpy as np
+from utils.near_duplicates import QuestionBank, minhash, shingles, similarity
+
+
+def jaccard(a, b):
+    a, b = shingles(a), shingles(b)
+    return len(a & b) / len(a | b)
+
+
+def test_minhash_tracks_exact_jaccard():
+    rng = random.Random(0)
+    words = "cell energy atp protein membrane market price supply demand river ocean treaty empire vector proof".split()
+    errors = []
+    for _ in range(200):
+        a = [rng.choice(words) for _ in range(10)]
+        b = list(a)
+        for _ in range(rng.randint(0, 6)):
+            b[rng.randrange(len(b))] = rng.choice(words)
+        a, b = " ".join(a), " ".join(b)
+        errors.append(similarity(minhash(a), minhash(b)) - jaccard(a, b))
+    assert np.std(errors) < 0.06
+    assert max(abs(error) for error in errors) < 0.2
+
+
+def test_reworded_question_is_a_duplicate(tmp_path):
+    bank = QuestionBank(str(tmp_path / "bank.sqlite3"))
+    bank.add([{"question": "What organelle produces most of the ATP in a eukaryotic cell?"}])
+    assert bank.is_duplicate({"question": "Which organelle produces most of the ATP in a eukaryotic cell?"})
+    assert not bank.is_duplicate({"question": "What does the market price settle at when supply meets demand?"})
+
+
+def test_signatures_from_another_version_are_dropped(tmp_path):
+    path = str(tmp_path / "bank.sqlite3")
+    QuestionBank(path).add([{"question": "What organelle produces most of the ATP?"}])
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA user_version = 1")
+    conn.commit()
+    conn.close()
+    assert len(QuestionBank(path)) == 0
+
+
+def test_rows_banked_by_another_process_are_seen(tmp_path):
+    path = str(tmp_path / "bank.sqlite3")
+    server, worker = QuestionBank(path), QuestionBank(path)
+    question = {"question": "Which organelle produces most of the ATP in a eukaryotic cell?"}
+    assert server.filter_new([question]) == [question]
+    worker.add([question])
+    assert server.filter_new([question]) == []
+    assert server.is_duplicate(question)
+    server.add([{"question": "How does the market price settle when supply meets demand?"}])
+    assert len(server) == 2 and len(worker) == 1
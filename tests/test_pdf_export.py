@@ -0,0 +1,36 @@
+import os
+from utils.pdf_export import FONT_DIRS, _correct_option, export_papers, find_fonts, paper_file_name, render_pdf
+
+QUESTION = {"question": "What makes ATP?", "options": ["A) Mitochondria", "B) Nucleus", "C) Ribosome", "D) Golgi"]}
+
+
+def test_answer_key_option():
+    assert _correct_option({**QUESTION, "correct_answer": "b"}) == "B) Nucleus"
+    assert _correct_option({**QUESTION, "correct_answer": ""}) == "unknown"
+    assert _correct_option(QUESTION) == "unknown"
+
+
+def test_paper_file_name():
+    assert paper_file_name("questions/Biology unit 1.json") == "Biology_unit_1.pdf"
+    assert paper_file_name("...") == "paper.pdf"
+
+
+def test_render_pdf_with_answer_key():
+    questions = {"mcq": [{**QUESTION, "correct_answer": "A"}],
+                 "short_answer": [{"question": "Что такое клетка?", "answer": "Единица жизни."}]}
+    assert render_pdf(questions, "Paper A", answer_key=True).startswith(b"%PDF")
+
+
+def test_bundled_unicode_font_is_found():
+    fonts = find_fonts()
+    assert fonts is not None
+    assert all(os.path.exists(font) for font in fonts)
+    assert os.path.exists(os.path.join(FONT_DIRS[0], "DejaVuSans.ttf"))
+
+
+def test_export_papers_in_worker_processes(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    questions = {"mcq": [{**QUESTION, "correct_answer": "A"}], "short_answer": []}
+    names = export_papers([("a", questions), ("a", questions), ("b", questions)], str(tmp_path / "out"), workers=2)
+    assert names == ["a.pdf", "a-2.pdf", "b.pdf"]
+    assert all((tmp_path / "out" / name).read_bytes().startswith(b"%PDF") for name in names)
@@ -0,0 +1,52 @@
+import pytest
+from utils.chunking import allocate
+from utils.planning import REJECT, BudgetExceeded, plan_generation, plan_requests, split_counts
+
+
+def pdf(name, text, pages=1):
+    page_texts = [text[i::pages] for i in range(pages)] if pages > 1 else [text]
+    return {"filename": name, "text": text, "pages": pages, "page_texts": page_texts}
+
+
+def test_allocate_sums_exactly_and_follows_weights():
+    assert allocate(10, [1, 1, 1]) == [4, 3, 3]
+    assert allocate(5, [0, 3, 1]) == [0, 4, 1]
+    assert allocate(0, [1, 2]) == [0, 0]
+    assert allocate(3, [0, 0]) == [2, 1]
+    for total in range(20):
+        assert sum(allocate(total, [5, 1, 7, 2])) == total
+
+
+def test_split_counts_keeps_both_totals():
+    counts = split_counts(3, 2, [100, 100, 1, 1])
+    assert sum(m for m, _ in counts) == 3
+    assert sum(a for _, a in counts) == 2
+
+
+def test_plan_requests_skips_documents_without_questions():
+    docs = [pdf("a.pdf", "Cells make energy. " * 50), pdf("b.pdf", "Markets set prices. " * 50)]
+    requests = plan_requests(docs, [(2, 1), (0, 0)])
+    assert [(request[0]["filename"], request[2], request[3]) for request in requests] == [("a.pdf", 2, 1)]
+
+
+def test_plan_requests_spreads_counts_over_chunks():
+    requests = plan_requests([pdf("a.pdf", "word " * 4000, pages=4)], [(4, 4)], max_chunk_tokens=1000)
+    assert len(requests) > 1
+    assert sum(mcqs for *_, mcqs, _ in requests) == 4
+    assert sum(answers for *_, answers in requests) == 4
+
+
+def test_documents_without_text_get_no_requests():
+    plan = plan_generation([pdf("scan.pdf", "\n"), pdf("a.pdf", "Cells make energy. " * 50)], 2, 2)
+    assert plan.doc_counts == [(0, 0), (2, 2)]
+    assert [request[0]["filename"] for request in plan.requests] == ["a.pdf"]
+
+
+def test_no_text_at_all_is_an_error():
+    with pytest.raises(ValueError):
+        plan_generation([pdf("scan.pdf", "\n")], 2, 2)
+
+
+def test_reject_over_budget():
+    with pytest.raises(BudgetExceeded):
+        plan_generation([pdf("a.pdf", "Cells make energy. " * 500)], 2, 2, token_budget=500, over_budget=REJECT)
@@ -0,0 +1,70 @@
+import json
+from utils.benchmark import synthetic_pdf
+from utils.jobs import JobFile
+from utils.near_duplicates import QuestionBank
+from utils.planning import GenerationPlan
+from utils.question_generator import QuestionGenerator
+from utils.question_schema import parse_questions
+
+MCQ = {"question": "What makes ATP?", "options": ["A) Mitochondria", "B) Nucleus", "C) Ribosome", "D) Golgi"],
+       "correct_answer": "A"}
+SHORT = {"question": "What is a cell?", "answer": "The basic unit of life."}
+
+
+def test_parse_questions_salvages_items_from_a_truncated_response():
+    text = "```json\n" + json.dumps({"mcq": [MCQ, MCQ], "short_answer": [SHORT]})[:-40]
+    questions, dropped = parse_questions(text)
+    assert len(questions["mcq"]) == 2
+    assert dropped == 0
+
+
+def test_parse_questions_drops_invalid_items():
+    bad = {"question": "No options?", "options": ["A) one"], "correct_answer": "A"}
+    questions, dropped = parse_questions(json.dumps({"mcq": [MCQ, bad], "short_answer": [SHORT, {"question": "?"}]}))
+    assert (len(questions["mcq"]), len(questions["short_answer"]), dropped) == (1, 1, 2)
+
+
+def test_failed_retry_keeps_salvaged_items():
+    responses = [json.dumps({"mcq": [MCQ], "short_answer": []}), RuntimeError("quota")]
+
+    def generate_content(prompt, use_cache=True):
+        response = responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    generator = QuestionGenerator.__new__(QuestionGenerator)
+    generator._generate_content = generate_content
+    questions, dropped = generator._generate_chunk({"filename": "a.pdf"}, "Cells make ATP.", "Medium", 2, 1)
+    assert questions["mcq"] == [MCQ]
+    assert not questions["short_answer"]
+    assert not responses
+
+
+def test_questions_banked_elsewhere_during_a_run_do_not_drop_accepted_ones(tmp_path):
+    bank = QuestionBank(str(tmp_path / "bank.sqlite3"))
+    first = {"question": "Which organelle produces most of the ATP in a eukaryotic cell?", "answer": "Mitochondria."}
+    second = {"question": "How does the market price settle when supply meets demand?", "answer": "At equilibrium."}
+    batches = [{"mcq": [], "short_answer": [first]}, {"mcq": [], "short_answer": [second]}]
+
+    def iter_round(requests, *args, **kwargs):
+        for batch in batches:
+            yield batch
+            # Another session banks the same question while this run is still going
+            bank.add([first])
+
+    generator = QuestionGenerator.__new__(QuestionGenerator)
+    generator._iter_round = iter_round
+    yielded = list(generator.iter_questions([], "Medium", 0, 2, question_bank=bank,
+                                            plan=GenerationPlan([], [], []), token_budget=0))
+    assert yielded == [{"mcq": [], "short_answer": [first]}, {"mcq": [], "short_answer": [second]}]
+
+
+def test_parallel_extraction_matches_serial(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    files = [JobFile(synthetic_pdf(pages, seed=pages), f"{pages}.pdf") for pages in (3, 9)]
+    generator = QuestionGenerator(api_key="offline")
+    serial = generator.extract_text_from_pdfs(files)
+    parallel = generator.extract_text_from_pdfs(files, workers=2)
+    assert [pdf["page_texts"] for pdf in parallel] == [pdf["page_texts"] for pdf in serial]
+    assert [pdf["pages"] for pdf in parallel] == [3, 9]
@@ -0,0 +1,24 @@
+from utils.question_store import QuestionStore
+
+QUESTIONS = {"mcq": [{"question": "What makes ATP?", "options": ["A) Mitochondria", "B) Nucleus", "C) Ribosome",
+                                                                "D) Golgi"], "correct_answer": "A", "source": "a.pdf"}],
+             "short_answer": [{"question": "What is a cell?", "answer": "The unit of life.", "source": "a.pdf"}]}
+
+
+def test_sets_round_trip(tmp_path):
+    store = QuestionStore(str(tmp_path / "questions.sqlite3"))
+    store.save_set("s1", QUESTIONS, "Medium")
+    assert store.load_set("s1") == QUESTIONS
+    assert QuestionStore(store.path).load_set("s1") == QUESTIONS
+
+
+def test_saved_and_loaded_sets_are_copies(tmp_path):
+    store = QuestionStore(str(tmp_path / "questions.sqlite3"))
+    questions = {"mcq": [dict(QUESTIONS["mcq"][0])], "short_answer": []}
+    store.save_set("s1", questions)
+    store.save_set("s2", store.load_set("s1"))
+    questions["mcq"][0]["question"] = "Changed by the caller"
+    loaded = store.load_set("s2")
+    loaded["mcq"].clear()
+    assert store.load_set("s1")["mcq"][0]["question"] == "What makes ATP?"
+    assert len(store.load_set("s2")["mcq"]) == 1
@@ -0,0 +1,40 @@
+import random
+from utils.chunking import estimate_tokens
+from utils.salience import select_salient_pages
+
+WORDS = "cell energy protein membrane market price supply demand river ocean treaty empire vector proof".split()
+
+
+def page(rng, words):
+    lines = [" ".join(rng.choice(WORDS) for _ in range(12)) for _ in range(words // 12)]
+    return "\n".join(lines)
+
+
+def pdf(page_texts):
+    return {"filename": "a.pdf", "text": "\n".join(page_texts) + "\n", "pages": len(page_texts),
+            "page_texts": page_texts}
+
+
+def test_small_documents_are_left_alone():
+    doc = pdf(["A short page about cells."])
+    assert select_salient_pages([doc], 2000) == [doc]
+
+
+def test_oversized_pages_are_cut_to_the_budget():
+    rng = random.Random(0)
+    doc = pdf([page(rng, 8000), page(rng, 8000)])
+    assert estimate_tokens(doc["text"]) > 20000
+    for budget in (2000, 500, 37):
+        trimmed = select_salient_pages([doc], budget)[0]
+        assert 0 < estimate_tokens(trimmed["text"]) <= budget
+        assert set(trimmed["selected_pages"]) <= {1, 2}
+        assert trimmed["text_chars"] == len(doc["text"].strip())
+
+
+def test_kept_pages_follow_document_order():
+    rng = random.Random(1)
+    pages = [page(rng, 300) for _ in range(10)]
+    trimmed = select_salient_pages([pdf(pages)], 1000)[0]
+    assert trimmed["selected_pages"] == sorted(trimmed["selected_pages"])
+    assert estimate_tokens(trimmed["text"]) <= 1000
+    assert all(text in pages for text in trimmed["page_texts"])
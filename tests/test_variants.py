@@ -0,0 +1,43 @@
+from utils.variants import make_variants, variant_label
+
+
+def mcq(n, answer="A"):
+    return {"question": f"Question {n}?", "options": [f"{letter}) Option {letter}{n}" for letter in "ABCD"],
+            "correct_answer": answer}
+
+
+QUESTIONS = {"mcq": [mcq(n, "ABCD"[n % 4]) for n in range(8)],
+             "short_answer": [{"question": f"Explain {n}.", "answer": f"Answer {n}."} for n in range(4)]}
+
+
+def correct_text(q):
+    return next(option[3:] for option in q["options"] if option.startswith(q["correct_answer"]))
+
+
+def test_variant_labels():
+    assert [variant_label(i) for i in (0, 1, 25, 26, 27, 701, 702)] == ["A", "B", "Z", "AA", "AB", "ZZ", "AAA"]
+
+
+def test_variants_keep_the_correct_option():
+    originals = {q["question"]: correct_text(q) for q in QUESTIONS["mcq"]}
+    for _, variant in make_variants(QUESTIONS, 5, seed=3):
+        assert sorted(q["question"] for q in variant["mcq"]) == sorted(originals)
+        for q in variant["mcq"]:
+            assert correct_text(q) == originals[q["question"]]
+        assert sorted(q["question"] for q in variant["short_answer"]) == sorted(q["question"] for q in QUESTIONS["short_answer"])
+
+
+def test_variants_are_seeded_and_independent_of_count():
+    assert make_variants(QUESTIONS, 3, seed=1) == make_variants(QUESTIONS, 3, seed=1)
+    assert make_variants(QUESTIONS, 2, seed=1)[1] == make_variants(QUESTIONS, 5, seed=1)[1]
+    assert make_variants(QUESTIONS, 2, seed=1) != make_variants(QUESTIONS, 2, seed=2)
+
+
+def test_positional_and_oversized_questions_keep_their_options():
+    pinned = {"question": "Pick one", "options": ["A) Red", "B) Blue", "C) Green", "D) All of the above"],
+              "correct_answer": "D"}
+    wide = {"question": "Pick five", "options": [f"{letter}) {letter}" for letter in "ABCDEF"], "correct_answer": "F"}
+    for _, variant in make_variants({"mcq": [pinned, wide], "short_answer": []}, 4):
+        by_question = {q["question"]: q for q in variant["mcq"]}
+        assert by_question["Pick one"]["options"] == pinned["options"]
+        assert by_question["Pick five"] == wide
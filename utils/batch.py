@@ -0,0 +1,175 @@
+"""Generate question sets for a directory or manifest of PDFs, without Streamlit.
+
+    python -m utils.batch papers/ --out questions/ --mcqs 5 --answers 3
+
+Each PDF gets ``<out>/<name>.json`` in the same format as the app. Finished
+documents are recorded in ``<out>/checkpoint.json``, so an interrupted run
+picks up where it stopped when started again with the same arguments.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sys
+
+CHECKPOINT_FILE = "checkpoint.json"
+# PDFs extracted together; bounds how much text is held in memory at once
+DEFAULT_BATCH_SIZE = 8
+
+logger = logging.getLogger("question_generator.batch")
+
+
+def _write_json(path, value):
+    # Write then rename, so an interrupted run never leaves a half-written file
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(value, f, indent=2, ensure_ascii=False)
+    os.replace(path + ".tmp", path)
+
+
+def _log_notify(level, message):
+    logger.log(logging.ERROR if level == "error" else logging.WARNING, message)
+
+
+def find_pdfs(source):
+    if os.path.isdir(source):
+        return sorted(os.path.join(source, name) for name in os.listdir(source) if name.lower().endswith(".pdf"))
+    # Otherwise a manifest: one PDF path per line, relative to the manifest
+    base = os.path.dirname(os.path.abspath(source))
+    with open(source, encoding="utf-8") as f:
+        lines = [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+    return [line if os.path.isabs(line) else os.path.join(base, line) for line in lines]
+
+
+def output_name(path):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    # Same file name from different folders must not collide
+    return f"{stem}-{hashlib.sha256(os.path.abspath(path).encode('utf-8')).hexdigest()[:8]}.json"
+
+
+def load_checkpoint(out_dir):
+    path = os.path.join(out_dir, CHECKPOINT_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def run(args):
+    from utils.jobs import JobFile
+    from utils.question_generator import QuestionGenerator
+    from utils.config import get_api_key
+    from utils.extraction_cache import ExtractionCache
+    from utils.compaction import compact_pdf_texts
+    from utils.planning import GenerationPlan, plan_generation
+
+    api_key = get_api_key(args.config)
+    if not api_key:
+        raise SystemExit("No API key found. Set GOOGLE_API_KEY or pass --config with a secret_key entry.")
+
+    os.makedirs(args.out, exist_ok=True)
+    settings = {"difficulty": args.difficulty, "num_mcqs": args.mcqs, "num_answers": args.answers, "backend": args.backend,
+                "token_budget": args.token_budget, "over_budget": args.over_budget,
+                "compact_text": not args.keep_layout, "drop_references": args.drop_references}
+    checkpoint = load_checkpoint(args.out)
+
+    pending = []
+    for path in find_pdfs(args.source):
+        with open(path, "rb") as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+        done = checkpoint.get(path)
+        if done and done["sha256"] == digest and done["settings"] == settings \
+                and os.path.exists(os.path.join(args.out, done["output"])):
+            continue
+        pending.append((path, digest))
+    logger.info("%d PDF(s) to process, %d already done", len(pending), len(checkpoint))
+
+    generator = QuestionGenerator(extraction_cache=ExtractionCache(), api_key=api_key, notify=_log_notify)
+    failures = 0
+    for start in range(0, len(pending), args.batch_size):
+        batch = dict(pending[start:start + args.batch_size])
+        files = []
+        for path in batch:
+            with open(path, "rb") as f:
+                files.append(JobFile(f.read(), path))
+        extracted = generator.extract_text_from_pdfs(files, workers=args.workers, backend=args.backend)
+        if extracted and not args.keep_layout:
+            extracted = compact_pdf_texts(extracted, args.drop_references)
+            for pdf in extracted:
+                logger.info("Compaction removed about %d tokens from %s", pdf["tokens_removed"], pdf["filename"])
+        pdf_texts = {pdf["filename"]: pdf for pdf in extracted}
+
+        # Every document gets its own counts and budget, then all their requests share one pool of --concurrency
+        plans = []
+        for path in batch:
+            if path not in pdf_texts:
+                logger.error("Could not extract text from %s", path)
+                failures += 1
+                continue
+            try:
+                plans.append(plan_generation([pdf_texts[path]], args.mcqs, args.answers,
+                                             token_budget=args.token_budget, over_budget=args.over_budget))
+            except ValueError as e:
+                logger.error("Skipping %s: %s", path, e)
+                failures += 1
+        if not plans:
+            continue
+        plan = GenerationPlan([p.pdf_texts[0] for p in plans], [p.doc_counts[0] for p in plans],
+                              [request for p in plans for request in p.requests])
+        results = {pdf["filename"]: {"mcq": [], "short_answer": []} for pdf in plan.pdf_texts}
+        for questions in generator.iter_questions(plan.pdf_texts, args.difficulty, args.mcqs, args.answers,
+                                                  max_concurrency=args.concurrency, ordered=True, token_budget=0,
+                                                  plan=plan):
+            for q_type in ("mcq", "short_answer"):
+                for q in questions[q_type]:
+                    results[q["source"]][q_type].append(q)
+
+        for path, questions in results.items():
+            if not questions["mcq"] and not questions["short_answer"]:
+                logger.error("No questions generated for %s", path)
+                failures += 1
+                continue
+            for q in questions["mcq"] + questions["short_answer"]:
+                q["source"] = os.path.basename(path)
+            name = output_name(path)
+            _write_json(os.path.join(args.out, name), questions)
+            checkpoint[path] = {"sha256": batch[path], "settings": settings, "output": name}
+            _write_json(os.path.join(args.out, CHECKPOINT_FILE), checkpoint)
+            logger.info("Wrote %s (%d MCQs, %d short answers)", name, len(questions["mcq"]),
+                        len(questions["short_answer"]))
+    return failures
+
+
+def main(argv=None):
+    from utils.pdf_extraction import BACKENDS, DEFAULT_BACKEND
+    from utils.question_generator import DEFAULT_MAX_CONCURRENCY
+    from utils.planning import DEFAULT_TOKEN_BUDGET, DOWNSCALE, REJECT
+
+    parser = argparse.ArgumentParser(description="Generate question sets for many PDFs without the Streamlit app.")
+    parser.add_argument("source", help="directory of PDFs, or a manifest file listing one PDF path per line")
+    parser.add_argument("--out", required=True, help="directory for per-document JSON output and the checkpoint")
+    parser.add_argument("--difficulty", default="Medium", choices=["Simple", "Medium", "Hard"])
+    parser.add_argument("--mcqs", type=int, default=5, help="MCQs per document")
+    parser.add_argument("--answers", type=int, default=3, help="short answer questions per document")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="PDF extraction processes")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_MAX_CONCURRENCY,
+                        help="Gemini requests in flight at once, across all documents")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="PDFs extracted per batch")
+    parser.add_argument("--backend", default=DEFAULT_BACKEND, choices=list(BACKENDS))
+    parser.add_argument("--token-budget", type=int, default=DEFAULT_TOKEN_BUDGET,
+                        help="estimated tokens allowed per document (0 = no limit)")
+    parser.add_argument("--over-budget", default=DOWNSCALE, choices=[DOWNSCALE, REJECT],
+                        help="trim documents to their key pages, or skip them, when over the budget")
+    parser.add_argument("--keep-layout", action="store_true",
+                        help="send the extracted text as is, without stripping headers, footers and layout noise")
+    parser.add_argument("--drop-references", action="store_true",
+                        help="leave out reference lists and bibliographies")
+    parser.add_argument("--config", help="TOML file with a secret_key entry, used when GOOGLE_API_KEY is not set")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    return 1 if run(args) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,166 @@
+"""Offline performance benchmarks against a fake Gemini backend.
+
+    python -m utils.benchmark --sizes 5 20 80 --latency 0.05 --out results.json
+
+For each corpus size a synthetic PDF with that many pages is built, then the
+run measures text extraction, question generation, grading and PDF export.
+No network calls are made. Caches are written to a temporary directory, so
+every run starts cold and the app's own caches are left alone. Results are
+JSON, so runs can be compared over time.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+DEFAULT_SIZES = [5, 20, 80]
+_WORDS = ("the cell uses energy from food to build proteins and the market sets a price where supply meets "
+          "demand while a proof shows the theorem holds for every vector in the space and the river carries "
+          "sediment to the ocean as the empire signed a treaty").split()
+
+
+def synthetic_pdf(pages, seed=0):
+    """A text PDF with ``pages`` pages of headings and paragraphs, as bytes."""
+    from fpdf import FPDF
+    rng = random.Random(seed)
+    pdf = FPDF()
+    pdf.set_auto_page_break(False)
+    for page in range(pages):
+        pdf.add_page()
+        pdf.set_font("Arial", "B", 14)
+        pdf.cell(0, 10, f"Chapter {page + 1}: {' '.join(rng.sample(_WORDS, 3)).title()}", ln=True)
+        pdf.set_font("Arial", size=10)
+        for _ in range(4):
+            pdf.multi_cell(0, 5, " ".join(rng.choice(_WORDS) for _ in range(90)).capitalize() + ".")
+            pdf.ln(2)
+    return pdf.output(dest="S").encode("latin-1")
+
+
+def _timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def run_size(pages, args, fake, gateway):
+    from utils.jobs import JobFile
+    from utils.question_generator import QuestionGenerator, create_pdf
+    from utils.test_utils import compare_answers, iter_grades
+
+    generator = QuestionGenerator(api_key="offline")
+    data = synthetic_pdf(pages, args.seed)
+    result = {"pages": pages, "pdf_bytes": len(data)}
+
+    pdf_texts, seconds = _timed(generator.extract_text_from_pdfs, [JobFile(data, f"synthetic-{pages}.pdf")],
+                                workers=args.workers, backend=args.backend)
+    result["extraction"] = {"seconds": seconds, "pages_per_sec": pages / seconds if seconds else None}
+
+    calls = fake.calls
+    questions, seconds = _timed(generator.generate_questions, pdf_texts, "Medium", args.mcqs, args.answers,
+                                max_concurrency=args.concurrency, use_cache=False)
+    result["generation"] = {
+        "seconds": seconds,
+        "mcqs": len(questions["mcq"]),
+        "short_answers": len(questions["short_answer"]),
+        "model_calls": fake.calls - calls,
+    }
+
+    # Answers that never match exactly, so every one needs the model
+    short_answers = questions["short_answer"] or [{"question": "What is a cell?", "answer": "A unit of life."}]
+    answers = [(q, f"my answer {i}") for i, q in zip(range(args.answers_to_grade), _cycle(short_answers))]
+    calls = fake.calls
+    _, seconds = _timed(lambda: [compare_answers(q["question"], q["answer"], a, use_cache=False) for q, a in answers])
+    result["grading"] = {"answers": len(answers), "seconds": seconds,
+                         "answers_per_sec": len(answers) / seconds if seconds else None,
+                         "model_calls": fake.calls - calls}
+    calls = fake.calls
+    _, seconds = _timed(lambda: list(iter_grades([("short_answer", q, a) for q, a in answers], use_cache=False)))
+    result["batch_grading"] = {"answers": len(answers), "seconds": seconds,
+                               "answers_per_sec": len(answers) / seconds if seconds else None,
+                               "model_calls": fake.calls - calls}
+
+    pdf_bytes, seconds = _timed(create_pdf, questions)
+    result["pdf_export"] = {"questions": len(questions["mcq"]) + len(questions["short_answer"]),
+                            "seconds": seconds, "bytes": len(pdf_bytes)}
+    result["gateway_retries"] = gateway.retries
+    return result
+
+
+def _cycle(items):
+    while True:
+        yield from items
+
+
+def run(args):
+    from utils.fake_gemini import FakeGenerativeModel, use_fake_gemini
+    from utils.metrics import get_metrics
+
+    if args.recordings:
+        fake = FakeGenerativeModel.from_file(args.recordings, latency=args.latency, jitter=args.jitter,
+                                             error_rate=args.error_rate, seed=args.seed)
+    else:
+        fake = FakeGenerativeModel(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                                   seed=args.seed)
+    report = {
+        "started": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "settings": {key: value for key, value in vars(args).items() if key != "out"},
+        "results": [],
+    }
+    # The app's caches live under the working directory
+    os.environ.setdefault("GOOGLE_API_KEY", "offline")
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir, \
+            use_fake_gemini(fake, requests_per_minute=10 ** 9, tokens_per_minute=10 ** 12) as gateway:
+        os.chdir(workdir)
+        try:
+            for pages in args.sizes:
+                report["results"].append(run_size(pages, args, fake, gateway))
+        finally:
+            os.chdir(cwd)
+    report["model_calls"] = fake.calls
+    report["injected_errors"] = fake.errors
+    report["stages"] = get_metrics().stage_summary()
+    report["counters"] = get_metrics().counters()
+    return report
+
+
+def main(argv=None):
+    from utils.pdf_extraction import BACKENDS, DEFAULT_BACKEND
+    from utils.question_generator import DEFAULT_MAX_CONCURRENCY
+
+    parser = argparse.ArgumentParser(description="Benchmark extraction, generation, grading and PDF export offline.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="pages per synthetic PDF")
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per fake Gemini call")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random seconds per call, up to this much")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of calls that fail with a retryable error")
+    parser.add_argument("--recordings", help="JSON file mapping questions, grade and grade_batch to response texts")
+    parser.add_argument("--mcqs", type=int, default=10)
+    parser.add_argument("--answers", type=int, default=5)
+    parser.add_argument("--answers-to-grade", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="PDF extraction processes")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_MAX_CONCURRENCY, help="parallel generation requests")
+    parser.add_argument("--backend", default=DEFAULT_BACKEND, choices=list(BACKENDS))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    report = run(args)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
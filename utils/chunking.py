@@ -0,0 +1,68 @@
+import re
+
+# Rough Gemini tokenizer ratio for English prose; good enough for budgeting
+CHARS_PER_TOKEN = 4
+DEFAULT_CHUNK_TOKENS = 8000
+
+
+def estimate_tokens(text):
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def chunk_pages(page_texts, max_tokens=DEFAULT_CHUNK_TOKENS):
+    """Group consecutive pages into chunks of at most ``max_tokens``.
+
+    Chunks always break on page boundaries, except for a single page that is
+    too large on its own, which is cut into ``max_tokens`` slices.
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    chunks = []
+    current = []
+    current_chars = 0
+    for page_text in page_texts:
+        if len(page_text) > max_chars:
+            if current:
+                chunks.append("\n".join(current))
+                current, current_chars = [], 0
+            chunks.extend(page_text[i:i + max_chars] for i in range(0, len(page_text), max_chars))
+            continue
+        if current and current_chars + len(page_text) > max_chars:
+            chunks.append("\n".join(current))
+            current, current_chars = [], 0
+        current.append(page_text)
+        current_chars += len(page_text) + 1
+    if current:
+        chunks.append("\n".join(current))
+    return [chunk for chunk in chunks if chunk.strip()]
+
+
+def allocate(total, weights):
+    """Split ``total`` into integers proportional to ``weights`` that sum to ``total`` exactly."""
+    weight_sum = sum(weights)
+    if not weights or total <= 0:
+        return [0] * len(weights)
+    if weight_sum <= 0:
+        weights = [1] * len(weights)
+        weight_sum = len(weights)
+    shares = [total * weight / weight_sum for weight in weights]
+    counts = [int(share) for share in shares]
+    # Largest remainder first; ties go to the earlier item so the split is deterministic
+    by_remainder = sorted(range(len(shares)), key=lambda i: (counts[i] - shares[i], i))
+    for i in by_remainder[:total - sum(counts)]:
+        counts[i] += 1
+    return counts
+
+
+def _question_key(question):
+    return re.sub(r"[^a-z0-9 ]", "", " ".join(question["question"].lower().split()))
+
+
+def dedupe_questions(questions):
+    seen = set()
+    unique = []
+    for question in questions:
+        key = _question_key(question)
+        if key not in seen:
+            seen.add(key)
+            unique.append(question)
+    return unique
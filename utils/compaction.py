@@ -0,0 +1,100 @@
+import re
+from collections import Counter
+from utils.chunking import estimate_tokens
+from utils.metrics import get_metrics, timed
+
+# Running headers and footers sit in the first or last few lines of a page
+EDGE_LINES = 2
+# A line counts as repeated when it is on at least this share of pages (and on 3 or more)
+MIN_REPEAT_SHARE = 0.5
+MIN_REPEAT_PAGES = 3
+# Headers and footers are short; long lines that repeat are body text
+MAX_REPEAT_CHARS = 80
+
+_PAGE_NUMBER_RE = re.compile(r"^(page\s*)?[-–—\s]*\d{1,4}[-–—\s]*((of|/)\s*\d{1,4})?$", re.IGNORECASE)
+# A number at either end of a line, where running headers and footers put the page number
+_EDGE_NUMBER_RE = re.compile(r"^\d+\b|\b\d+$")
+_REFERENCES_RE = re.compile(r"^(references|bibliography|works cited|literature cited|reference list)\s*:?$", re.IGNORECASE)
+# Reference lists end where the next chapter, section or appendix starts
+_SECTION_START_RE = re.compile(r"^(chapter|part|section|unit|lesson|appendix)\b", re.IGNORECASE)
+_CITATION_RE = re.compile(r"^(\[\d+\]|\d+\.\s)|\b(19|20)\d{2}\b")
+_HYPHEN_BREAK_RE = re.compile(r"(\w)-\n[ \t]*([a-z])")
+_SPACES_RE = re.compile(r"[ \t ]+")
+_BLANK_LINES_RE = re.compile(r"\n{3,}")
+
+
+def _line_key(line):
+    # Only a page number at the start or end may differ between copies of a header; body lines must repeat exactly
+    return _EDGE_NUMBER_RE.sub("#", " ".join(line.lower().split()))
+
+
+def _lines(page_text):
+    # Hyphen breaks are rejoined first, so removing an edge line never leaves half a word behind
+    text = _HYPHEN_BREAK_RE.sub(r"\1\2", _SPACES_RE.sub(" ", page_text))
+    return [line.strip() for line in text.splitlines()]
+
+
+def _edge_keys(lines):
+    edges = lines[:EDGE_LINES] + lines[-EDGE_LINES:] if len(lines) > 2 * EDGE_LINES else lines
+    return {_line_key(line) for line in edges if line and len(line) <= MAX_REPEAT_CHARS}
+
+
+def repeated_lines(page_texts):
+    """Keys of lines that recur at the top or bottom of many pages."""
+    if len(page_texts) < MIN_REPEAT_PAGES:
+        return set()
+    counts = Counter(key for page_text in page_texts for key in _edge_keys(_lines(page_text)))
+    threshold = max(MIN_REPEAT_PAGES, MIN_REPEAT_SHARE * len(page_texts))
+    return {key for key, count in counts.items() if count >= threshold}
+
+
+def _clean_page(page_text, repeated):
+    lines = _lines(page_text)
+    edges = set(range(min(EDGE_LINES, len(lines)))) | set(range(max(0, len(lines) - EDGE_LINES), len(lines)))
+    kept = [line for number, line in enumerate(lines)
+            if not (number in edges and (_PAGE_NUMBER_RE.match(line) or _line_key(line) in repeated))]
+    return _BLANK_LINES_RE.sub("\n\n", "\n".join(kept)).strip()
+
+
+def _drop_references(page_texts):
+    # A references heading starts the drop; the next chapter or section heading, or a page without citations, ends it
+    pages = []
+    dropping = False
+    for page_text in page_texts:
+        lines = page_text.split("\n")
+        if dropping and not any(_CITATION_RE.search(line) for line in lines):
+            dropping = False
+        kept = []
+        for line in lines:
+            if _REFERENCES_RE.match(line):
+                dropping = True
+            elif dropping and _SECTION_START_RE.match(line):
+                dropping = False
+            if not dropping:
+                kept.append(line)
+        pages.append("\n".join(kept).strip())
+    return pages
+
+
+def compact_pages(page_texts, drop_references=False):
+    """Page texts without running headers, footers, page numbers, hyphen breaks and extra whitespace."""
+    repeated = repeated_lines(page_texts)
+    pages = [_clean_page(page_text, repeated) for page_text in page_texts]
+    return _drop_references(pages) if drop_references else pages
+
+
+def compact_pdf_texts(pdf_texts, drop_references=False):
+    """Apply ``compact_pages`` to extracted documents, keeping the ``extract_text_from_pdfs`` format.
+
+    Each record gains ``tokens_removed`` (estimated) so the saving can be shown per document.
+    """
+    compacted = []
+    with timed("compact_text", files=len(pdf_texts)) as stage:
+        for pdf in pdf_texts:
+            page_texts = compact_pages(pdf.get("page_texts", [pdf["text"]]), drop_references)
+            text = "\n".join(page_texts) + "\n"
+            removed = max(0, estimate_tokens(pdf["text"]) - estimate_tokens(text))
+            compacted.append({**pdf, "text": text, "page_texts": page_texts, "tokens_removed": removed})
+        stage["tokens_removed"] = sum(pdf["tokens_removed"] for pdf in compacted)
+    get_metrics().increment("compaction_tokens_removed_total", stage["tokens_removed"])
+    return compacted
@@ -0,0 +1,50 @@
+import os
+try:
+    import tomllib
+except ImportError:
+    # Python < 3.11
+    import tomli as tomllib
+
+# Optional file for headless runs; same format as .streamlit/secrets.toml
+CONFIG_PATH_ENV = "QUESTION_GENERATOR_CONFIG"
+
+# Only keys that were found are remembered, so a key set later in the process is still picked up
+_resolved_keys = {}
+
+
+def _from_streamlit_secrets():
+    try:
+        import streamlit as st
+        return st.secrets.get("secret_key")
+    except Exception:
+        # No secrets.toml, or no Streamlit at all
+        return None
+
+
+def get_api_key(config_path=None):
+    """Resolve the Gemini API key, remembering it once found.
+
+    Order: the ``GOOGLE_API_KEY`` environment variable (``.env`` included),
+    then ``secret_key`` in a TOML config file (``config_path`` or
+    ``$QUESTION_GENERATOR_CONFIG``), then Streamlit secrets.
+    """
+    if config_path in _resolved_keys:
+        return _resolved_keys[config_path]
+    api_key = _find_api_key(config_path)
+    if api_key:
+        _resolved_keys[config_path] = api_key
+    return api_key
+
+
+def _find_api_key(config_path):
+    from dotenv import load_dotenv
+    load_dotenv()
+    if os.getenv("GOOGLE_API_KEY"):
+        return os.getenv("GOOGLE_API_KEY")
+    config_path = config_path or os.getenv(CONFIG_PATH_ENV)
+    if config_path:
+        with open(config_path, "rb") as f:
+            config = tomllib.load(f)
+        if config.get("secret_key"):
+            return config["secret_key"]
+    return _from_streamlit_secrets()
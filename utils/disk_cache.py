@@ -0,0 +1,113 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from utils.metrics import get_metrics
+
+# Wall clock for entry timestamps; tests replace it
+_now = time.time
+
+
+class DiskCache:
+    """JSON values in a SQLite table with a size cap, LRU eviction and an optional TTL.
+
+    SQLite in WAL mode, with one connection per call, lets several Streamlit
+    sessions (or processes) share one cache file safely.
+    """
+
+    table = "entries"
+
+    def __init__(self, path, max_bytes, ttl=None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._stats_lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS {self.table} (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created REAL NOT NULL,
+                    last_used REAL NOT NULL
+                )
+            """)
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{self.table}_last_used ON {self.table} (last_used)")
+
+    def _connect(self):
+        # A fresh connection per call keeps this safe across Streamlit's script threads
+        return closing(sqlite3.connect(self.path, timeout=30, isolation_level=None))
+
+    def _count(self, hit):
+        with self._stats_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        get_metrics().increment("cache_requests_total", cache=self.table, result="hit" if hit else "miss")
+
+    def get_key(self, key):
+        now = _now()
+        with self._connect() as conn:
+            row = conn.execute(f"SELECT value, created FROM {self.table} WHERE key = ?", (key,)).fetchone()
+            if row and self.ttl is not None and now - row[1] > self.ttl:
+                conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                row = None
+            if row:
+                conn.execute(f"UPDATE {self.table} SET last_used = ? WHERE key = ?", (now, key))
+        self._count(row is not None)
+        return json.loads(row[0]) if row else None
+
+    def put_key(self, key, value):
+        payload = json.dumps(value)
+        size = len(payload.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        now = _now()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    f"INSERT OR REPLACE INTO {self.table} (key, value, size, created, last_used) VALUES (?, ?, ?, ?, ?)",
+                    (key, payload, size, now, now),
+                )
+                if self.ttl is not None:
+                    conn.execute(f"DELETE FROM {self.table} WHERE created < ?", (now - self.ttl,))
+                total = conn.execute(f"SELECT COALESCE(SUM(size), 0) FROM {self.table}").fetchone()[0]
+                for old_key, old_size in conn.execute(
+                    f"SELECT key, size FROM {self.table} WHERE key != ? ORDER BY last_used", (key,)
+                ).fetchall():
+                    if total <= self.max_bytes:
+                        break
+                    conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (old_key,))
+                    total -= old_size
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute(f"DELETE FROM {self.table}")
+
+    def stats(self):
+        with self._connect() as conn:
+            entries, size = conn.execute(f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM {self.table}").fetchone()
+        with self._stats_lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "size_bytes": size,
+            "max_bytes": self.max_bytes,
+        }
@@ -0,0 +1,25 @@
+import hashlib
+import os
+from utils.disk_cache import DiskCache
+
+DEFAULT_CACHE_PATH = os.path.join(".cache", "extractions.sqlite3")
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+def pdf_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class ExtractionCache(DiskCache):
+    """Extracted page text, keyed by the SHA-256 of the PDF bytes and the backend."""
+
+    table = "page_text"
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES):
+        super().__init__(path, max_bytes)
+
+    def get(self, data, backend=""):
+        return self.get_key(f"{pdf_hash(data)}:{backend}")
+
+    def put(self, data, pages, backend=""):
+        self.put_key(f"{pdf_hash(data)}:{backend}", pages)
@@ -0,0 +1,126 @@
+"""A local stand-in for ``genai.GenerativeModel``, for benchmarks and offline runs.
+
+It answers question-generation and grading prompts with recorded responses
+when they are given, or with synthetic responses in the format the app
+expects, after a configurable delay. A share of calls can fail with a
+retryable API error to exercise the gateway's backoff.
+"""
+import json
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from types import SimpleNamespace
+from utils import llm_gateway
+from utils.chunking import estimate_tokens
+
+FAKE_MODEL_NAME = "fake-gemini"
+_WORDS = ("cell membrane protein energy enzyme reaction market price supply demand theorem proof "
+          "vector matrix signal network layer gradient climate ocean current river empire treaty").split()
+
+
+class FakeResponse:
+    def __init__(self, text, prompt=""):
+        self.text = text
+        # Estimated the same way as the gateway's token bucket
+        self.usage_metadata = SimpleNamespace(prompt_token_count=estimate_tokens(prompt),
+                                              candidates_token_count=estimate_tokens(text))
+
+
+def prompt_kind(prompt):
+    """Which app prompt this is: ``questions``, ``grade`` or ``grade_batch``."""
+    if "Grade each of the following answers" in prompt:
+        return "grade_batch"
+    if "Compare the user's answer to the correct answer" in prompt:
+        return "grade"
+    return "questions"
+
+
+class FakeGenerativeModel:
+    """Thread-safe fake with per-call ``latency`` (plus up to ``jitter``) and an ``error_rate``.
+
+    ``recordings`` maps a prompt kind to response texts, which are replayed in
+    order and then cycled. Kinds without recordings get synthetic responses.
+    """
+
+    def __init__(self, latency=0.05, jitter=0.0, error_rate=0.0, recordings=None, seed=0,
+                 model_name=FAKE_MODEL_NAME):
+        self.model_name = model_name
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.recordings = recordings or {}
+        self.calls = 0
+        self.errors = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, path, **kwargs):
+        with open(path, encoding="utf-8") as f:
+            return cls(recordings=json.load(f), **kwargs)
+
+    def generate_content(self, prompt, **kwargs):
+        kind = prompt_kind(prompt)
+        with self._lock:
+            call = self.calls
+            self.calls += 1
+            delay = self.latency + self._random.uniform(0, self.jitter)
+            fail = self._random.random() < self.error_rate
+            seed = self._random.random()
+        time.sleep(delay)
+        if fail:
+            from google.api_core import exceptions as google_exceptions
+            with self._lock:
+                self.errors += 1
+            raise google_exceptions.ServiceUnavailable("Injected fake Gemini error")
+        recorded = self.recordings.get(kind)
+        if recorded:
+            return FakeResponse(recorded[call % len(recorded)], prompt)
+        return FakeResponse(_synthetic_response(kind, prompt, random.Random(seed)), prompt)
+
+
+def _phrase(rng, words=6):
+    return " ".join(rng.choice(_WORDS) for _ in range(words))
+
+
+def _synthetic_response(kind, prompt, rng):
+    if kind == "grade":
+        return (f"Score: {rng.randint(0, 10)}\nCorrect: {_phrase(rng)}\n"
+                f"Incorrect: {_phrase(rng)}\nSuggestions: {_phrase(rng)}")
+    if kind == "grade_batch":
+        ids = [int(i) for i in re.findall(r'"id": (\d+)', prompt)]
+        return json.dumps([{"id": i, "score": rng.randint(0, 10), "correct": _phrase(rng),
+                            "incorrect": _phrase(rng), "suggestions": _phrase(rng)} for i in ids])
+    mcqs = re.search(r"- (\d+) Multiple Choice", prompt)
+    answers = re.search(r"- (\d+) Short Answer", prompt)
+    return json.dumps({
+        "mcq": [{"question": f"{_phrase(rng, 10)}?",
+                 "options": [f"{letter}) {_phrase(rng, 3)}" for letter in "ABCD"],
+                 "correct_answer": rng.choice("ABCD")}
+                for _ in range(int(mcqs.group(1)) if mcqs else 0)],
+        "short_answer": [{"question": f"{_phrase(rng, 10)}?", "answer": _phrase(rng, 20)}
+                         for _ in range(int(answers.group(1)) if answers else 0)],
+    })
+
+
+@contextmanager
+def use_fake_gemini(model, model_name=llm_gateway.DEFAULT_MODEL, **gateway_options):
+    """Serve ``get_gateway(..., model_name)`` from ``model`` inside the block.
+
+    The fake is wrapped in a real ``LLMGateway``, so rate limits and retries
+    behave as they do against the API. Yields the gateway.
+    """
+    gateway = llm_gateway.LLMGateway(model_name, model=model, **gateway_options)
+    with llm_gateway._gateways_lock:
+        previous = llm_gateway._gateways.get(model_name)
+        llm_gateway._gateways[model_name] = gateway
+    try:
+        yield gateway
+    finally:
+        with llm_gateway._gateways_lock:
+            if previous is None:
+                llm_gateway._gateways.pop(model_name, None)
+            else:
+                llm_gateway._gateways[model_name] = previous
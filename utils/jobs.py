@@ -0,0 +1,244 @@
+import argparse
+import hashlib
+import io
+import json
+import logging
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+import traceback
+from contextlib import closing
+
+DEFAULT_QUEUE_PATH = os.path.join(".cache", "jobs.sqlite3")
+DEFAULT_FILES_DIR = os.path.join(".cache", "job_files")
+POLL_INTERVAL = 2.0
+# Workers touch their running job this often; one that has gone quiet for STALE_AFTER is handed to another worker
+HEARTBEAT_INTERVAL = 60
+STALE_AFTER = 10 * 60
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+logger = logging.getLogger("question_generator.jobs")
+# Wall clock for job timestamps; tests replace it
+_now = time.time
+
+
+class JobFile(io.BytesIO):
+    """A stored PDF that looks like a Streamlit upload to ``extract_text_from_pdfs``."""
+
+    def __init__(self, data, name):
+        super().__init__(data)
+        self.name = name
+
+
+def job_question_set_id(job_id):
+    return f"job-{job_id}"
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobQueue:
+    """Persistent queue of extraction-plus-generation jobs.
+
+    Jobs and their PDFs live on disk, so queued work survives an app restart.
+    A job's id is a hash of its PDFs and settings, so submitting the same job
+    twice returns the existing one.
+    """
+
+    def __init__(self, path=DEFAULT_QUEUE_PATH, files_dir=DEFAULT_FILES_DIR):
+        self.path = path
+        self.files_dir = files_dir
+        os.makedirs(files_dir, exist_ok=True)
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    files TEXT NOT NULL,
+                    settings TEXT NOT NULL,
+                    error TEXT,
+                    worker_pid INTEGER,
+                    created REAL NOT NULL,
+                    updated REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created)")
+
+    def _connect(self):
+        return closing(sqlite3.connect(self.path, timeout=30, isolation_level=None))
+
+    def submit(self, pdf_files, settings):
+        files = []
+        for pdf_file in pdf_files:
+            data = pdf_file.getvalue()
+            digest = hashlib.sha256(data).hexdigest()
+            path = os.path.join(self.files_dir, f"{digest}.pdf")
+            if not os.path.exists(path):
+                with open(path + ".tmp", "wb") as f:
+                    f.write(data)
+                os.replace(path + ".tmp", path)
+            files.append({"name": pdf_file.name, "sha256": digest})
+
+        job_id = hashlib.sha256(json.dumps([files, settings], sort_keys=True).encode("utf-8")).hexdigest()[:16]
+        now = _now()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "INSERT OR IGNORE INTO jobs (job_id, status, files, settings, created, updated) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, QUEUED, json.dumps(files), json.dumps(settings), now, now),
+            )
+            # Resubmitting a failed job retries it
+            conn.execute("UPDATE jobs SET status = ?, error = NULL, updated = ? WHERE job_id = ? AND status = ?",
+                         (QUEUED, now, job_id, FAILED))
+            conn.execute("COMMIT")
+        return job_id
+
+    def claim(self, worker_pid):
+        now = _now()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for job_id, status, owner, updated in conn.execute(
+                    "SELECT job_id, status, worker_pid, updated FROM jobs WHERE status IN (?, ?) ORDER BY created",
+                    (QUEUED, RUNNING),
+                ).fetchall():
+                    abandoned = status == RUNNING and (now - updated > STALE_AFTER or not _pid_alive(owner))
+                    if status == QUEUED or abandoned:
+                        conn.execute("UPDATE jobs SET status = ?, worker_pid = ?, updated = ? WHERE job_id = ?",
+                                     (RUNNING, worker_pid, now, job_id))
+                        conn.execute("COMMIT")
+                        return self.get(job_id)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return None
+
+    def heartbeat(self, job_id, worker_pid):
+        with self._connect() as conn:
+            conn.execute("UPDATE jobs SET updated = ? WHERE job_id = ? AND status = ? AND worker_pid = ?",
+                         (_now(), job_id, RUNNING, worker_pid))
+
+    def finish(self, job_id, error=None):
+        with self._connect() as conn:
+            conn.execute("UPDATE jobs SET status = ?, error = ?, updated = ? WHERE job_id = ?",
+                         (FAILED if error else DONE, error, _now(), job_id))
+
+    def get(self, job_id):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT job_id, status, files, settings, error, created, updated FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        if not row:
+            return None
+        return {
+            "job_id": row[0], "status": row[1], "files": json.loads(row[2]), "settings": json.loads(row[3]),
+            "error": row[4], "created": row[5], "updated": row[6],
+        }
+
+    def open_files(self, job):
+        files = []
+        for file_info in job["files"]:
+            with open(os.path.join(self.files_dir, f"{file_info['sha256']}.pdf"), "rb") as f:
+                files.append(JobFile(f.read(), file_info["name"]))
+        return files
+
+
+def process_job(queue, job):
+    # Imported here so a worker process only loads the generation stack when it has work
+    from utils.compaction import compact_pdf_texts
+    from utils.extraction_cache import ExtractionCache
+    from utils.near_duplicates import get_question_bank
+    from utils.planning import DEFAULT_TOKEN_BUDGET, DOWNSCALE
+    from utils.question_generator import QuestionGenerator
+    from utils.question_store import get_question_store
+    from utils.response_cache import get_response_cache
+    from utils.salience import select_salient_pages
+
+    settings = job["settings"]
+    # There is no Streamlit page here; warnings are logged and kept for the job's error message
+    messages = []
+
+    def notify(level, message):
+        logger.log(logging.ERROR if level == "error" else logging.WARNING, "Job %s: %s", job["job_id"], message)
+        messages.append(message)
+
+    generator = QuestionGenerator(extraction_cache=ExtractionCache(), response_cache=get_response_cache(),
+                                  notify=notify)
+    # Worker processes are daemons and cannot start their own extraction pool
+    pdf_texts = generator.extract_text_from_pdfs(queue.open_files(job), backend=settings["backend"])
+    if not pdf_texts:
+        raise ValueError("No text could be extracted from the uploaded PDFs")
+    if settings.get("compact_text", True):
+        pdf_texts = compact_pdf_texts(pdf_texts, settings.get("drop_references", False))
+    if settings.get("prompt_budget"):
+        pdf_texts = select_salient_pages(pdf_texts, settings["prompt_budget"])
+    questions = generator.generate_questions(
+        pdf_texts, settings["difficulty"], settings["num_mcqs"], settings["num_answers"],
+        max_concurrency=settings["max_concurrency"], use_cache=settings["use_cache"],
+        question_bank=get_question_bank() if settings["avoid_repeats"] else None,
+        token_budget=settings.get("token_budget", DEFAULT_TOKEN_BUDGET), over_budget=settings.get("over_budget", DOWNSCALE),
+    )
+    if len(questions["mcq"]) < settings["num_mcqs"] or len(questions["short_answer"]) < settings["num_answers"]:
+        raise ValueError(" ".join([f"Only {len(questions['mcq'])} of {settings['num_mcqs']} MCQs and "
+                                   f"{len(questions['short_answer'])} of {settings['num_answers']} short answers "
+                                   f"were generated."] + messages))
+    get_question_store().save_set(job_question_set_id(job["job_id"]), questions, settings["difficulty"])
+
+
+def run_worker(queue_path=DEFAULT_QUEUE_PATH, files_dir=DEFAULT_FILES_DIR, poll_interval=POLL_INTERVAL):
+    queue = JobQueue(queue_path, files_dir)
+    while True:
+        job = queue.claim(os.getpid())
+        if job is None:
+            time.sleep(poll_interval)
+            continue
+        stop = threading.Event()
+        beat = threading.Thread(target=_heartbeat, args=(queue, job["job_id"], os.getpid(), stop), daemon=True)
+        beat.start()
+        try:
+            process_job(queue, job)
+            queue.finish(job["job_id"])
+        except Exception as e:
+            traceback.print_exc()
+            queue.finish(job["job_id"], error=str(e))
+        finally:
+            stop.set()
+            beat.join()
+
+
+def _heartbeat(queue, job_id, worker_pid, stop):
+    while not stop.wait(HEARTBEAT_INTERVAL):
+        queue.heartbeat(job_id, worker_pid)
+
+
+def start_workers(count, queue_path=DEFAULT_QUEUE_PATH, files_dir=DEFAULT_FILES_DIR):
+    # Spawn, not fork: workers may be started from inside the Streamlit server and must not inherit its threads
+    context = multiprocessing.get_context("spawn")
+    workers = []
+    for _ in range(count):
+        worker = context.Process(target=run_worker, args=(queue_path, files_dir), daemon=True)
+        worker.start()
+        workers.append(worker)
+    return workers
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run background question generation workers.")
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+    for worker in start_workers(args.workers):
+        worker.join()
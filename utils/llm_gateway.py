@@ -0,0 +1,106 @@
+import os
+import random
+import threading
+import time
+from utils.chunking import estimate_tokens
+from utils.metrics import get_metrics, timed
+
+DEFAULT_MODEL = 'gemini-1.5-flash'
+# Shared by every session in this server process; match them to the API key's quota
+REQUESTS_PER_MINUTE = int(os.getenv("GEMINI_REQUESTS_PER_MINUTE", "15"))
+TOKENS_PER_MINUTE = int(os.getenv("GEMINI_TOKENS_PER_MINUTE", "1000000"))
+MAX_RETRIES = 5
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 32.0
+
+_gateways = {}
+_gateways_lock = threading.Lock()
+
+
+def retryable_errors():
+    # google.api_core comes with the Gemini SDK, which is only imported once a call is made
+    from google.api_core import exceptions as google_exceptions
+    return (
+        google_exceptions.ResourceExhausted,
+        google_exceptions.TooManyRequests,
+        google_exceptions.ServiceUnavailable,
+        google_exceptions.DeadlineExceeded,
+        google_exceptions.InternalServerError,
+    )
+
+
+class TokenBucket:
+    """Blocking token bucket that refills ``per_minute`` tokens evenly over a minute."""
+
+    def __init__(self, per_minute):
+        if per_minute <= 0:
+            raise ValueError(f"A rate limit must be a positive number per minute, got {per_minute}")
+        self.capacity = per_minute
+        self.tokens = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, amount=1):
+        # A single request larger than the whole bucket waits for a full bucket instead of forever
+        amount = min(amount, self.capacity)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait = (amount - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class LLMGateway:
+    """One long-lived Gemini model shared by the generator and the grader.
+
+    Calls wait for room in the shared requests-per-minute and tokens-per-minute
+    buckets, and retryable API errors are retried with jittered exponential
+    backoff. It exposes ``generate_content`` and ``model_name`` so it can be
+    used anywhere a ``genai.GenerativeModel`` is. Pass ``model`` to wrap any
+    object with that interface instead, such as a local fake.
+    """
+
+    def __init__(self, model_name=DEFAULT_MODEL, requests_per_minute=REQUESTS_PER_MINUTE,
+                 tokens_per_minute=TOKENS_PER_MINUTE, max_retries=MAX_RETRIES, model=None):
+        if model is None:
+            import google.generativeai as genai
+            model = genai.GenerativeModel(model_name)
+        self.model = model
+        self.model_name = self.model.model_name
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_retries = max_retries
+        self.retries = 0
+        self._retries_lock = threading.Lock()
+
+    def generate_content(self, prompt, **kwargs):
+        retryable = retryable_errors()
+        for attempt in range(self.max_retries + 1):
+            self.requests.acquire()
+            self.tokens.acquire(estimate_tokens(prompt))
+            try:
+                with timed("gemini_call", model=self.model_name, attempt=attempt):
+                    return self.model.generate_content(prompt, **kwargs)
+            except retryable:
+                if attempt == self.max_retries:
+                    raise
+                with self._retries_lock:
+                    self.retries += 1
+                get_metrics().increment("gemini_retries_total", model=self.model_name)
+                time.sleep(random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt)))
+
+
+def get_gateway(api_key, model_name=DEFAULT_MODEL):
+    """The process-wide gateway for ``model_name``, configuring the API key on first use."""
+    with _gateways_lock:
+        if model_name not in _gateways:
+            import google.generativeai as genai
+            genai.configure(api_key=api_key)
+            _gateways[model_name] = LLMGateway(model_name)
+        return _gateways[model_name]
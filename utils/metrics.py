@@ -0,0 +1,196 @@
+"""Per-stage timings, Gemini token counts, retries, cache hits and estimated cost.
+
+Stages are timed with ``timed("stage")``. Each finished stage is also written
+as one JSON line to the ``question_generator.metrics`` logger, or to the file
+named by ``$QUESTION_GENERATOR_METRICS_LOG``. Everything can be exported in
+Prometheus text format. Set ``$QUESTION_GENERATOR_METRICS_PORT`` to serve it
+at ``/metrics``.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Recent samples per stage used for percentiles; sums and counts cover the whole process
+SAMPLE_WINDOW = 1000
+QUANTILES = (0.5, 0.9, 0.99)
+PREFIX = "question_generator_"
+# USD per million tokens; the defaults are gemini-1.5-flash list prices
+INPUT_COST_PER_MILLION = float(os.getenv("GEMINI_INPUT_COST_PER_MILLION", "0.075"))
+OUTPUT_COST_PER_MILLION = float(os.getenv("GEMINI_OUTPUT_COST_PER_MILLION", "0.30"))
+
+COUNTER_HELP = {
+    "gemini_prompt_tokens_total": "Prompt tokens reported by Gemini.",
+    "gemini_response_tokens_total": "Response tokens reported by Gemini.",
+    "gemini_cost_usd_total": "Estimated Gemini cost in USD from token counts.",
+    "gemini_retries_total": "Gemini calls retried after a retryable error.",
+    "cache_requests_total": "Cache lookups by cache and result.",
+    "compaction_tokens_removed_total": "Estimated prompt tokens removed by text compaction.",
+}
+
+logger = logging.getLogger("question_generator.metrics")
+
+_default_metrics = None
+_default_metrics_lock = threading.Lock()
+
+
+def _labels(labels):
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}" if labels else ""
+
+
+class Metrics:
+    """Thread-safe, in-process metrics shared by every session in the server process."""
+
+    def __init__(self, window=SAMPLE_WINDOW):
+        self.window = window
+        self._lock = threading.Lock()
+        self._samples = {}
+        self._totals = {}
+        self._counters = {}
+
+    @contextmanager
+    def stage(self, name, **fields):
+        """Time the block as ``name``; add to the yielded dict to include more fields in the log line."""
+        start = time.perf_counter()
+        error = None
+        try:
+            yield fields
+        except Exception as e:
+            error = type(e).__name__
+            raise
+        finally:
+            seconds = time.perf_counter() - start
+            self.observe(name, seconds)
+            record = {"event": "stage", "stage": name, "seconds": round(seconds, 6), **fields}
+            if error:
+                record["error"] = error
+            logger.info(json.dumps(record, default=str))
+
+    def observe(self, name, seconds):
+        with self._lock:
+            self._samples.setdefault(name, deque(maxlen=self.window)).append(seconds)
+            count, total = self._totals.get(name, (0, 0.0))
+            self._totals[name] = (count + 1, total + seconds)
+
+    def increment(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def counter(self, name, **labels):
+        with self._lock:
+            return self._counters.get((name, tuple(sorted(labels.items()))), 0)
+
+    def record_usage(self, response, model_name=""):
+        """Count tokens and cost from a Gemini response's ``usage_metadata``, when it has one."""
+        usage = getattr(response, "usage_metadata", None)
+        if usage is None:
+            return
+        prompt_tokens = getattr(usage, "prompt_token_count", 0) or 0
+        response_tokens = getattr(usage, "candidates_token_count", 0) or 0
+        self.increment("gemini_prompt_tokens_total", prompt_tokens, model=model_name)
+        self.increment("gemini_response_tokens_total", response_tokens, model=model_name)
+        self.increment("gemini_cost_usd_total", (prompt_tokens * INPUT_COST_PER_MILLION
+                                                 + response_tokens * OUTPUT_COST_PER_MILLION) / 1e6, model=model_name)
+
+    def percentiles(self, name, quantiles=QUANTILES):
+        with self._lock:
+            samples = sorted(self._samples.get(name, ()))
+        if not samples:
+            return {}
+        # Nearest rank
+        return {q: samples[min(len(samples) - 1, int(q * len(samples)))] for q in quantiles}
+
+    def stage_summary(self):
+        """One row per stage: call count, total and mean seconds, and recent percentiles."""
+        with self._lock:
+            totals = dict(self._totals)
+        rows = []
+        for name, (count, total) in sorted(totals.items()):
+            row = {"stage": name, "count": count, "total_seconds": total, "mean_seconds": total / count}
+            row.update({f"p{int(q * 100)}": seconds for q, seconds in self.percentiles(name).items()})
+            rows.append(row)
+        return rows
+
+    def counters(self):
+        with self._lock:
+            return [{"name": name, **dict(labels), "value": value}
+                    for (name, labels), value in sorted(self._counters.items())]
+
+    def prometheus_text(self):
+        lines = [f"# HELP {PREFIX}stage_seconds Wall time per stage; quantiles cover the most recent samples.",
+                 f"# TYPE {PREFIX}stage_seconds summary"]
+        with self._lock:
+            totals = dict(self._totals)
+            counters = dict(self._counters)
+        for name, (count, total) in sorted(totals.items()):
+            for q, seconds in self.percentiles(name).items():
+                lines.append(f'{PREFIX}stage_seconds{{stage="{name}",quantile="{q}"}} {seconds}')
+            lines.append(f'{PREFIX}stage_seconds_sum{{stage="{name}"}} {total}')
+            lines.append(f'{PREFIX}stage_seconds_count{{stage="{name}"}} {count}')
+        for counter in sorted({name for name, _ in counters}):
+            lines.append(f"# HELP {PREFIX}{counter} {COUNTER_HELP.get(counter, counter)}")
+            lines.append(f"# TYPE {PREFIX}{counter} counter")
+            for (name, labels), value in sorted(counters.items()):
+                if name == counter:
+                    lines.append(f"{PREFIX}{name}{_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._totals.clear()
+            self._counters.clear()
+
+
+def serve_prometheus(metrics, port):
+    """Serve ``metrics`` at ``http://0.0.0.0:<port>/metrics`` from a daemon thread."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics.prometheus_text().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("0.0.0.0", port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
+
+
+def get_metrics():
+    """The process-wide metrics, setting up the JSON log file and Prometheus endpoint on first use."""
+    global _default_metrics
+    with _default_metrics_lock:
+        if _default_metrics is None:
+            _default_metrics = Metrics()
+            log_path = os.getenv("QUESTION_GENERATOR_METRICS_LOG")
+            if log_path:
+                handler = logging.FileHandler(log_path, encoding="utf-8")
+                handler.setFormatter(logging.Formatter("%(message)s"))
+                logger.addHandler(handler)
+                logger.setLevel(logging.INFO)
+            port = os.getenv("QUESTION_GENERATOR_METRICS_PORT")
+            if port:
+                try:
+                    serve_prometheus(_default_metrics, int(port))
+                except OSError as e:
+                    # Another process (for example a job worker) already serves this port
+                    logger.warning("Metrics endpoint not started on port %s: %s", port, e)
+        return _default_metrics
+
+
+def timed(name, **fields):
+    return get_metrics().stage(name, **fields)
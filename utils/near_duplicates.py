@@ -0,0 +1,172 @@
+import os
+import re
+import sqlite3
+import threading
+import zlib
+from collections import defaultdict
+from contextlib import closing
+import numpy as np
+
+DEFAULT_BANK_PATH = os.path.join(".cache", "question_bank.sqlite3")
+SHINGLE_SIZE = 5
+NUM_PERMUTATIONS = 128
+# 16 bands of 8 rows puts the LSH threshold at about 0.7 Jaccard similarity
+BANDS = 16
+ROWS_PER_BAND = NUM_PERMUTATIONS // BANDS
+DUPLICATE_THRESHOLD = 0.7
+
+# Bump when minhash() changes; stored signatures from another version are not comparable and are dropped
+SIGNATURE_VERSION = 2
+# Fixed seed: signatures are stored on disk and must stay comparable across runs
+_PERM_SEEDS = np.random.RandomState(1).randint(0, 1 << 63, NUM_PERMUTATIONS, dtype=np.int64).astype(np.uint64)
+
+_default_bank = None
+_default_bank_lock = threading.Lock()
+
+
+def question_text(question):
+    # MCQ options are part of what makes two questions the same
+    options = " ".join(re.sub(r"^\s*[A-Za-z][\).:]\s*", "", option) for option in question.get("options", []))
+    return f"{question['question']} {options}"
+
+
+def shingles(text):
+    normalized = " ".join(re.sub(r"[^\w\s]", " ", text.lower()).split())
+    if len(normalized) <= SHINGLE_SIZE:
+        return {zlib.crc32(normalized.encode("utf-8"))}
+    return {zlib.crc32(normalized[i:i + SHINGLE_SIZE].encode("utf-8"))
+            for i in range(len(normalized) - SHINGLE_SIZE + 1)}
+
+
+def _mix64(values):
+    # splitmix64 finaliser: a bijection on 64-bit ints that spreads every input bit over the output
+    values = values ^ (values >> np.uint64(30))
+    values = values * np.uint64(0xBF58476D1CE4E5B9)
+    values = values ^ (values >> np.uint64(27))
+    values = values * np.uint64(0x94D049BB133111EB)
+    return values ^ (values >> np.uint64(31))
+
+
+def minhash(text):
+    hashes = np.fromiter(shingles(text), dtype=np.uint64)
+    # One independently seeded 64-bit hash per permutation; multiplication wraps modulo 2**64 as intended
+    with np.errstate(over="ignore"):
+        return _mix64(_PERM_SEEDS[:, None] ^ hashes[None, :]).min(axis=1)
+
+
+def similarity(signature, other):
+    return float(np.mean(signature == other))
+
+
+class LSHIndex:
+    """In-memory MinHash LSH index: a lookup only compares against signatures sharing a band."""
+
+    def __init__(self, threshold=DUPLICATE_THRESHOLD):
+        self.threshold = threshold
+        self._signatures = []
+        self._buckets = defaultdict(list)
+
+    def __len__(self):
+        return len(self._signatures)
+
+    def _bands(self, signature):
+        return [(band, signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND].tobytes()) for band in range(BANDS)]
+
+    def add(self, signature):
+        position = len(self._signatures)
+        self._signatures.append(signature)
+        for key in self._bands(signature):
+            self._buckets[key].append(position)
+
+    def is_duplicate(self, signature):
+        candidates = {position for key in self._bands(signature) for position in self._buckets.get(key, ())}
+        return any(similarity(signature, self._signatures[position]) >= self.threshold for position in candidates)
+
+
+class QuestionBank:
+    """Previously accepted questions, checked for near-duplicates with MinHash LSH.
+
+    Signatures are persisted in SQLite and the LSH index is rebuilt in memory
+    on start-up. Rows added since, by background workers or the batch CLI in
+    other processes, are pulled in before every check.
+    """
+
+    def __init__(self, path=DEFAULT_BANK_PATH, threshold=DUPLICATE_THRESHOLD):
+        self.path = path
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._index = LSHIndex(threshold)
+        self._last_id = 0
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS signatures (id INTEGER PRIMARY KEY, signature BLOB NOT NULL)")
+            # Signatures only keep hashes, so ones made by an older minhash() cannot be rebuilt
+            if conn.execute("PRAGMA user_version").fetchone()[0] != SIGNATURE_VERSION:
+                conn.execute("DELETE FROM signatures")
+                conn.execute(f"PRAGMA user_version = {SIGNATURE_VERSION}")
+        with self._lock:
+            self._refresh()
+
+    def _connect(self):
+        return closing(sqlite3.connect(self.path, timeout=30, isolation_level=None))
+
+    def _refresh(self):
+        # Caller holds self._lock; ids only grow, so everything past the last one loaded is new
+        with self._connect() as conn:
+            rows = conn.execute("SELECT id, signature FROM signatures WHERE id > ? ORDER BY id",
+                                (self._last_id,)).fetchall()
+        for row_id, blob in rows:
+            self._index.add(np.frombuffer(blob, dtype=np.uint64))
+            self._last_id = row_id
+
+    def __len__(self):
+        return len(self._index)
+
+    def is_duplicate(self, question):
+        signature = minhash(question_text(question))
+        with self._lock:
+            self._refresh()
+            return self._index.is_duplicate(signature)
+
+    def new_index(self):
+        """An empty in-memory index with the bank's threshold, for the questions accepted in one run."""
+        return LSHIndex(self.threshold)
+
+    def filter_new(self, questions, accepted=None):
+        """Questions that are neither in the bank nor near-copies of an earlier one in ``questions``.
+
+        ``accepted`` (from ``new_index``) holds questions already taken in this
+        run; they count as earlier ones, and the newly accepted are added to it.
+        """
+        new = []
+        batch = accepted if accepted is not None else self.new_index()
+        with self._lock:
+            self._refresh()
+        for question in questions:
+            signature = minhash(question_text(question))
+            with self._lock:
+                duplicate = self._index.is_duplicate(signature)
+            if not duplicate and not batch.is_duplicate(signature):
+                batch.add(signature)
+                new.append(question)
+        return new
+
+    def add(self, questions):
+        signatures = [minhash(question_text(question)) for question in questions]
+        with self._lock:
+            with self._connect() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.executemany("INSERT INTO signatures (signature) VALUES (?)",
+                                 [(signature.tobytes(),) for signature in signatures])
+                conn.execute("COMMIT")
+            self._refresh()
+
+
+def get_question_bank():
+    global _default_bank
+    with _default_bank_lock:
+        if _default_bank is None:
+            _default_bank = QuestionBank()
+        return _default_bank
@@ -0,0 +1,224 @@
+"""Render question papers to PDF with a Unicode TrueType font, one at a time or in bulk.
+
+    python -m utils.pdf_export questions/*.json --out papers.zip --answer-key
+
+The font is found once per process (``$QUESTION_GENERATOR_FONT`` and
+``$QUESTION_GENERATOR_BOLD_FONT``, then the DejaVu Sans shipped in ``fonts/``,
+then the usual system places). Its
+parsed metrics are cached under ``.cache/fonts``, so later documents and
+worker processes skip parsing. Without a TTF font, papers fall back to the
+built-in Arial, and characters it cannot show are replaced with ``?``.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import re
+import sys
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
+
+FONT_CACHE_DIR = os.path.join(".cache", "fonts")
+FONT_FAMILY = "QuestionSans"
+FONT_DIRS = [
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fonts"),
+    "/usr/share/fonts/truetype/dejavu",
+    "/usr/share/fonts/dejavu",
+    "/usr/local/share/fonts",
+    "/Library/Fonts",
+    "C:\\Windows\\Fonts",
+]
+REGULAR_FONT = "DejaVuSans.ttf"
+BOLD_FONT = "DejaVuSans-Bold.ttf"
+
+# The first add_font parses the TTF and writes the metrics cache; one thread at a time
+_font_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def find_fonts():
+    """``(regular, bold)`` TTF paths, or ``None`` to use the built-in Arial."""
+    regular = os.getenv("QUESTION_GENERATOR_FONT")
+    bold = os.getenv("QUESTION_GENERATOR_BOLD_FONT")
+    if regular and os.path.exists(regular):
+        return regular, bold if bold and os.path.exists(bold) else regular
+    for font_dir in FONT_DIRS:
+        if os.path.exists(os.path.join(font_dir, REGULAR_FONT)):
+            bold = os.path.join(font_dir, BOLD_FONT)
+            return os.path.join(font_dir, REGULAR_FONT), bold if os.path.exists(bold) else os.path.join(font_dir, REGULAR_FONT)
+    return None
+
+
+@lru_cache(maxsize=None)
+def _configure_fpdf():
+    import fpdf
+    # Mode 2 keeps parsed font metrics in our cache directory rather than next to the system font.
+    # Absolute, because this runs once per process and the working directory can change later
+    cache_dir = os.path.abspath(FONT_CACHE_DIR)
+    os.makedirs(cache_dir, exist_ok=True)
+    fpdf.set_global("FPDF_CACHE_MODE", 2)
+    fpdf.set_global("FPDF_CACHE_DIR", cache_dir)
+    return fpdf.FPDF
+
+
+class _Paper:
+    def __init__(self):
+        FPDF = _configure_fpdf()
+        self.pdf = FPDF()
+        self.fonts = find_fonts()
+        if self.fonts:
+            with _font_lock:
+                self.pdf.add_font(FONT_FAMILY, "", self.fonts[0], uni=True)
+                self.pdf.add_font(FONT_FAMILY, "B", self.fonts[1], uni=True)
+        self.pdf.add_page()
+
+    def font(self, style="", size=12):
+        self.pdf.set_font(FONT_FAMILY if self.fonts else "Arial", style, size)
+
+    def text(self, text):
+        # The built-in fonts only cover latin-1
+        return text if self.fonts else text.encode("latin-1", "replace").decode("latin-1")
+
+    def heading(self, text, size=14):
+        self.font("B", size)
+        self.pdf.multi_cell(0, 10, self.text(text))
+        self.font()
+
+    def line(self, text):
+        self.pdf.multi_cell(0, 10, self.text(text))
+
+
+def _correct_option(question):
+    letter = (question.get("correct_answer") or "").strip()[:1].upper()
+    if not letter:
+        return "unknown"
+    return next((option for option in question.get("options", []) if option.strip().upper().startswith(letter)), letter)
+
+
+def render_pdf(questions, title=None, answer_key=False):
+    """One paper as PDF bytes; ``answer_key`` adds a page with the answers."""
+    paper = _Paper()
+    if title:
+        paper.heading(title, 16)
+
+    # Add MCQs
+    paper.heading("Multiple Choice Questions")
+    for i, q in enumerate(questions['mcq'], 1):
+        paper.line(f"{i}. {q['question']} (Source: {q.get('source', '')})")
+        for option in q['options']:
+            paper.line(f"   {option}")
+        paper.pdf.ln(5)
+
+    # Add Short Answer Questions
+    paper.heading("Short Answer Questions")
+    for i, q in enumerate(questions['short_answer'], 1):
+        paper.line(f"{i}. {q['question']} (Source: {q.get('source', '')})")
+        paper.pdf.ln(5)
+
+    if answer_key:
+        paper.pdf.add_page()
+        paper.heading(f"Answer Key{f' - {title}' if title else ''}")
+        for i, q in enumerate(questions['mcq'], 1):
+            paper.line(f"MCQ {i}: {_correct_option(q)}")
+        for i, q in enumerate(questions['short_answer'], 1):
+            paper.line(f"Short answer {i}: {q['answer']}")
+
+    return paper.pdf.output(dest='S').encode('latin-1')
+
+
+def paper_file_name(name):
+    stem = re.sub(r"[^\w.-]+", "_", os.path.splitext(os.path.basename(name))[0]).strip("._") or "paper"
+    return stem + ".pdf"
+
+
+def _render_to_file(path, questions, title, answer_key):
+    with open(path + ".tmp", "wb") as f:
+        f.write(render_pdf(questions, title, answer_key))
+    os.replace(path + ".tmp", path)
+    return path
+
+
+def export_papers(papers, destination, answer_key=False, workers=None):
+    """Render ``(name, questions)`` pairs into a directory, or a zip archive if ``destination`` ends in ``.zip``.
+
+    Papers are rendered in up to ``workers`` processes and each one is
+    written out as soon as it is ready, so only papers in flight are held in
+    memory. Returns the written file names, in the order of ``papers``.
+    """
+    from utils.metrics import timed
+
+    names = []
+    for name, _ in papers:
+        file_name = paper_file_name(name)
+        # Two papers with the same name must not overwrite each other
+        stem, n = file_name[:-4], 2
+        while file_name in names:
+            file_name, n = f"{stem}-{n}.pdf", n + 1
+        names.append(file_name)
+
+    to_zip = destination.lower().endswith(".zip")
+    if to_zip:
+        if os.path.dirname(destination):
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+    else:
+        os.makedirs(destination, exist_ok=True)
+
+    with timed("export_papers", papers=len(papers), answer_key=answer_key, workers=workers or 1):
+        # Fill the font metrics cache before workers start, so they only ever read it
+        _Paper()
+        jobs = [(file_name, os.path.splitext(os.path.basename(name))[0], questions)
+                for file_name, (name, questions) in zip(names, papers)]
+        if to_zip:
+            # Workers hand back bytes and only this process writes to the archive
+            with zipfile.ZipFile(destination, "w", zipfile.ZIP_STORED) as archive:
+                for file_name, data in _iter_rendered(jobs, answer_key, workers):
+                    archive.writestr(file_name, data)
+        else:
+            for _ in _iter_rendered(jobs, answer_key, workers, destination):
+                pass
+    return names
+
+
+def _iter_rendered(jobs, answer_key, workers, directory=None):
+    # Yields (file_name, pdf_bytes) as papers finish; with a directory, workers write the files and yield paths
+    def task(file_name, name, questions):
+        if directory:
+            return _render_to_file, (os.path.join(directory, file_name), questions, name, answer_key)
+        return render_pdf, (questions, name, answer_key)
+
+    if not workers or workers <= 1:
+        for file_name, name, questions in jobs:
+            function, args = task(file_name, name, questions)
+            yield file_name, function(*args)
+        return
+    # Spawn, not fork: the page calls this from inside the threaded Streamlit server
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        futures = {}
+        for file_name, name, questions in jobs:
+            function, args = task(file_name, name, questions)
+            futures[executor.submit(function, *args)] = file_name
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render question set JSON files to PDF papers.")
+    parser.add_argument("files", nargs="+", help="question sets in the app's JSON format")
+    parser.add_argument("--out", required=True, help="output directory, or a path ending in .zip")
+    parser.add_argument("--answer-key", action="store_true", help="add an answer key page to each paper")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="rendering processes")
+    args = parser.parse_args(argv)
+
+    papers = []
+    for path in args.files:
+        with open(path, encoding="utf-8") as f:
+            papers.append((path, json.load(f)))
+    names = export_papers(papers, args.out, args.answer_key, args.workers)
+    print(f"Wrote {len(names)} paper(s) to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
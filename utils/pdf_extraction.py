@@ -0,0 +1,117 @@
+import io
+
+DEFAULT_BACKEND = "auto"
+
+# PyPDF2 output with this share of one-letter words is usually a broken multi-column layout
+MAX_SINGLE_CHAR_WORDS = 0.3
+
+
+class PdfPlumberBackend:
+    name = "pdfplumber"
+
+    def __init__(self, data):
+        import pdfplumber
+        self._pdf = pdfplumber.open(io.BytesIO(data))
+
+    def __len__(self):
+        return len(self._pdf.pages)
+
+    def page_text(self, page_number):
+        page = self._pdf.pages[page_number]
+        try:
+            return page.extract_text() or ""
+        finally:
+            # Drop the parsed layout so memory stays flat over long documents
+            page.close()
+
+    def close(self):
+        self._pdf.close()
+
+
+class PyPDF2Backend:
+    name = "pypdf2"
+
+    def __init__(self, data):
+        from PyPDF2 import PdfReader
+        self._reader = PdfReader(io.BytesIO(data))
+
+    def __len__(self):
+        return len(self._reader.pages)
+
+    def page_text(self, page_number):
+        return self._reader.pages[page_number].extract_text() or ""
+
+    def close(self):
+        self._reader.stream.close()
+
+
+def _needs_layout(text):
+    words = text.split()
+    if not words:
+        return True
+    return sum(len(word) == 1 for word in words) / len(words) > MAX_SINGLE_CHAR_WORDS
+
+
+class AutoBackend:
+    """PyPDF2 for plain text layers, pdfplumber only for pages it garbles."""
+
+    name = "auto"
+
+    def __init__(self, data):
+        self._data = data
+        self._fast = PyPDF2Backend(data)
+        self._layout = None
+
+    def __len__(self):
+        return len(self._fast)
+
+    def page_text(self, page_number):
+        try:
+            text = self._fast.page_text(page_number)
+            if not _needs_layout(text):
+                return text
+        except Exception:
+            pass
+        if self._layout is None:
+            self._layout = PdfPlumberBackend(self._data)
+        return self._layout.page_text(page_number)
+
+    def close(self):
+        self._fast.close()
+        if self._layout is not None:
+            self._layout.close()
+
+
+BACKENDS = {backend.name: backend for backend in (PdfPlumberBackend, PyPDF2Backend, AutoBackend)}
+
+
+def open_pdf(data, backend=DEFAULT_BACKEND):
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown PDF backend '{backend}'. Choose one of: {', '.join(BACKENDS)}")
+    return BACKENDS[backend](data)
+
+
+def count_pages(data, backend=DEFAULT_BACKEND):
+    document = open_pdf(data, backend)
+    try:
+        return len(document)
+    finally:
+        document.close()
+
+
+def iter_pdf_pages(data, backend=DEFAULT_BACKEND, start=0, stop=None):
+    """Yield ``(text, error)`` for each page, one page in memory at a time.
+
+    A page that cannot be read yields empty text and the error message, so
+    one bad page does not lose the rest of the document.
+    """
+    document = open_pdf(data, backend)
+    try:
+        stop = len(document) if stop is None else stop
+        for page_number in range(start, stop):
+            try:
+                yield document.page_text(page_number), None
+            except Exception as e:
+                yield "", str(e)
+    finally:
+        document.close()
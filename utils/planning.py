@@ -0,0 +1,103 @@
+import os
+from utils.chunking import DEFAULT_CHUNK_TOKENS, allocate, chunk_pages, estimate_tokens
+
+# Whole-job token limit for generation; 0 means no limit
+DEFAULT_TOKEN_BUDGET = int(os.getenv("QUESTION_TOKEN_BUDGET", "0"))
+DOWNSCALE = "downscale"
+REJECT = "reject"
+# The fixed prompt template, and rough response sizes per question, in tokens
+PROMPT_OVERHEAD_TOKENS = 250
+RESPONSE_TOKENS_PER_MCQ = 90
+RESPONSE_TOKENS_PER_ANSWER = 80
+
+
+class BudgetExceeded(ValueError):
+    pass
+
+
+def text_weight(pdf):
+    # Documents with no text (image-only scans) get no questions; trimmed ones still count at their full size
+    if not pdf["text"].strip():
+        return 0
+    return pdf.get("text_chars", len(pdf["text"].strip()))
+
+
+def split_counts(num_mcqs, num_answers, weights):
+    """``(mcqs, answers)`` per item, proportional to ``weights`` and summing exactly to the totals."""
+    totals = allocate(num_mcqs + num_answers, weights)
+    # MCQs follow the combined split, so both types land on the same items instead of piling up on the first
+    mcqs = allocate(num_mcqs, totals)
+    return [(m, total - m) for m, total in zip(mcqs, totals)]
+
+
+def plan_requests(pdf_texts, doc_counts, max_chunk_tokens=DEFAULT_CHUNK_TOKENS):
+    """``(pdf, chunk, mcqs, answers)`` for every Gemini request needed to generate ``doc_counts``."""
+    requests = []
+    for pdf, (pdf_mcqs, pdf_answers) in zip(pdf_texts, doc_counts):
+        if not pdf_mcqs and not pdf_answers:
+            continue
+        # Long documents are split into page-aligned chunks and the counts spread over them
+        chunks = [chunk for chunk in chunk_pages(pdf.get("page_texts", [pdf["text"]]), max_chunk_tokens) or [pdf["text"]]
+                  if chunk.strip()]
+        for chunk, (mcqs, answers) in zip(chunks, split_counts(pdf_mcqs, pdf_answers, [len(c) for c in chunks])):
+            if mcqs or answers:
+                requests.append((pdf, chunk, mcqs, answers))
+    return requests
+
+
+def estimate_request_tokens(chunk, mcqs, answers):
+    """``(prompt_tokens, response_tokens)`` expected for one request."""
+    return (estimate_tokens(chunk) + PROMPT_OVERHEAD_TOKENS,
+            mcqs * RESPONSE_TOKENS_PER_MCQ + answers * RESPONSE_TOKENS_PER_ANSWER)
+
+
+class GenerationPlan:
+    """How many questions each document gets, the requests that follow, and their estimated tokens."""
+
+    def __init__(self, pdf_texts, doc_counts, requests, downscaled=False):
+        self.pdf_texts = pdf_texts
+        self.doc_counts = doc_counts
+        self.requests = requests
+        self.downscaled = downscaled
+        estimates = [estimate_request_tokens(chunk, mcqs, answers) for _, chunk, mcqs, answers in requests]
+        self.prompt_tokens = sum(prompt for prompt, _ in estimates)
+        self.response_tokens = sum(response for _, response in estimates)
+
+    @property
+    def total_tokens(self):
+        return self.prompt_tokens + self.response_tokens
+
+
+def plan_generation(pdf_texts, num_mcqs, num_answers, max_chunk_tokens=DEFAULT_CHUNK_TOKENS,
+                    token_budget=DEFAULT_TOKEN_BUDGET, over_budget=DOWNSCALE):
+    """Split the requested counts exactly over ``pdf_texts`` by text volume and estimate the cost.
+
+    Documents that get no questions, including ones without any text, are
+    not sent at all; if no document has text, ``ValueError`` is raised. When
+    the estimate is over ``token_budget``, ``over_budget="reject"`` raises
+    ``BudgetExceeded``; ``"downscale"`` trims each document to its most
+    salient pages so the prompts fit, and raises only if even that is not
+    enough.
+    """
+    weights = [text_weight(pdf) for pdf in pdf_texts]
+    if not any(weights):
+        raise ValueError("No text could be extracted from the uploaded PDFs")
+    doc_counts = split_counts(num_mcqs, num_answers, weights)
+    plan = GenerationPlan(pdf_texts, doc_counts, plan_requests(pdf_texts, doc_counts, max_chunk_tokens))
+    if not token_budget or plan.total_tokens <= token_budget:
+        return plan
+    if over_budget == REJECT:
+        raise BudgetExceeded(f"This job needs about {plan.total_tokens:,} tokens, over the budget of {token_budget:,}.")
+
+    from utils.salience import select_salient_pages
+    # Whatever the template and responses do not use is shared out as document text, one request per document
+    used = [i for i, counts in enumerate(doc_counts) if any(counts)]
+    text_budget = token_budget - plan.response_tokens - PROMPT_OVERHEAD_TOKENS * len(used)
+    trimmed = list(pdf_texts)
+    for i, share in zip(used, allocate(max(0, text_budget), [text_weight(pdf_texts[i]) for i in used])):
+        trimmed[i] = select_salient_pages([pdf_texts[i]], share)[0]
+    plan = GenerationPlan(trimmed, doc_counts, plan_requests(trimmed, doc_counts, max_chunk_tokens), downscaled=True)
+    if plan.total_tokens > token_budget:
+        raise BudgetExceeded(f"Even trimmed to their key pages, these documents need about {plan.total_tokens:,} "
+                             f"tokens, over the budget of {token_budget:,}. Ask for fewer questions or raise the budget.")
+    return plan
@@ -1,116 +1,286 @@
-import pdfplumber
 import streamlit as st
-import json
-from fpdf import FPDF
-import google.generativeai as genai
+import multiprocessing
 import os
-from dotenv import load_dotenv
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from functools import lru_cache
+from utils.chunking import DEFAULT_CHUNK_TOKENS, dedupe_questions
+from utils.config import get_api_key
+from utils.llm_gateway import get_gateway
+from utils.metrics import timed
+from utils.question_schema import RESPONSE_CONFIG, parse_questions
+from utils.response_cache import cached_generate
+from utils.pdf_export import render_pdf
+from utils.planning import (DEFAULT_TOKEN_BUDGET, DOWNSCALE, estimate_request_tokens, plan_generation, plan_requests,
+                            split_counts, text_weight)
+from utils.pdf_extraction import DEFAULT_BACKEND, count_pages, iter_pdf_pages
 
-load_dotenv()
+# Each worker gets a few page ranges so uneven pages still balance out
+RANGES_PER_WORKER = 4
+
+# Gemini requests in flight at once while generating for several PDFs
+DEFAULT_MAX_CONCURRENCY = 4
+
+# Extra requests made to replace questions rejected as near-duplicates
+MAX_TOP_UP_ROUNDS = 2
+MAX_AVOIDED_QUESTIONS = 50
+# Follow-up requests for questions that came back missing or malformed
+MAX_PARSE_RETRIES = 1
+
+
+@lru_cache(maxsize=4)
+def _read_pdf(path):
+    # Each worker reads a file once, however many of its page ranges it is given
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _extract_page_range(path, start, stop, backend):
+    return list(iter_pdf_pages(_read_pdf(path), backend, start, stop))
+
+
+def _page_ranges(num_pages, workers):
+    size = max(1, -(-num_pages // (workers * RANGES_PER_WORKER)))
+    return [(start, min(start + size, num_pages)) for start in range(0, num_pages, size)]
+
+
+def streamlit_notify(level, message):
+    # Default progress output: st.warning / st.error on the running page
+    getattr(st, level)(message)
+
+
+def _pdf_record(filename, pages, notify=streamlit_notify):
+    failed_pages = [i for i, (_, error) in enumerate(pages, 1) if error]
+    for page_number in failed_pages:
+        notify("warning", f"Could not extract page {page_number} of {filename}: {pages[page_number - 1][1]}")
+    page_texts = [page_text for page_text, _ in pages]
+    return {"filename": filename, "text": "\n".join(page_texts) + "\n", "pages": len(pages),
+            "page_texts": page_texts, "failed_pages": failed_pages}
 
-GOOGLE_API_KEY = st.secrets['secret_key']
 
 class QuestionGenerator:
-    def __init__(self):
-        api_key = GOOGLE_API_KEY
+    def __init__(self, extraction_cache=None, response_cache=None, api_key=None, notify=streamlit_notify):
+        """``notify(level, message)`` receives warnings and errors; headless callers pass their own."""
+        api_key = api_key or get_api_key()
         if not api_key:
             raise ValueError("Google API Key not found. Please set the GOOGLE_API_KEY environment variable.")
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-1.5-flash')
+        self.model = get_gateway(api_key)
+        self.extraction_cache = extraction_cache
+        self.response_cache = response_cache
+        self.notify = notify
+
+    def extract_text_from_pdfs(self, pdf_files, workers=None, backend=DEFAULT_BACKEND):
+        with timed("extract_text", backend=backend, files=len(pdf_files)) as stage:
+            pdf_texts = self._extract_text(pdf_files, workers, backend)
+            stage["pages"] = sum(pdf["pages"] for pdf in pdf_texts)
+        return pdf_texts
+
+    def _extract_text(self, pdf_files, workers, backend):
+        extracted = {}
+        jobs = []
+        for index, pdf_file in enumerate(pdf_files):
+            data = pdf_file.getvalue()
+            cached = self.extraction_cache.get(data, backend) if self.extraction_cache else None
+            if cached is None:
+                jobs.append((index, pdf_file.name, data))
+            else:
+                extracted[index] = [(page_text, None) for page_text in cached]
+
+        extract = self._extract_pages_parallel if workers and workers > 1 else self._extract_pages
+        for index, data, pages in extract(jobs, workers, backend):
+            extracted[index] = pages
+            if self.extraction_cache and not any(error for _, error in pages):
+                self.extraction_cache.put(data, [page_text for page_text, _ in pages], backend)
 
-    def extract_text_from_pdfs(self, pdf_files):
-        all_texts = []
-        for pdf_file in pdf_files:
+        return [_pdf_record(pdf_files[index].name, extracted[index], self.notify) for index in sorted(extracted)]
+
+    def _extract_pages(self, jobs, workers, backend):
+        for index, filename, data in jobs:
             try:
-                pdf = pdfplumber.open(pdf_file)
-                text = ""
-                for page in pdf.pages:
-                    text += page.extract_text() + "\n"
-                all_texts.append({"filename": pdf_file.name, "text": text, "pages": len(pdf.pages)})
+                yield index, data, list(iter_pdf_pages(data, backend))
             except Exception as e:
-                st.error(f"Error extracting text from {pdf_file.name}: {str(e)}")
-        return all_texts
+                self.notify("error", f"Error extracting text from {filename}: {str(e)}")
+
+    def _extract_pages_parallel(self, jobs, workers, backend):
+        # Spawn, not fork, from inside the threaded Streamlit server. PDFs go to workers as temp file
+        # paths, so the bytes are not pickled again for every page range
+        with tempfile.TemporaryDirectory() as pdf_dir, \
+                ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            submitted = []
+            for index, filename, data in jobs:
+                try:
+                    num_pages = count_pages(data, backend)
+                except Exception as e:
+                    self.notify("error", f"Error extracting text from {filename}: {str(e)}")
+                    continue
+                path = os.path.join(pdf_dir, f"{index}.pdf")
+                with open(path, "wb") as f:
+                    f.write(data)
+                futures = [executor.submit(_extract_page_range, path, start, stop, backend)
+                           for start, stop in _page_ranges(num_pages, workers)]
+                submitted.append((index, filename, data, futures))
 
-    def generate_questions(self, pdf_texts, difficulty, num_mcqs, num_answers):
-        total_questions = num_mcqs + num_answers
+            for index, filename, data, futures in submitted:
+                try:
+                    yield index, data, [page for future in futures for page in future.result()]
+                except Exception as e:
+                    self.notify("error", f"Error extracting text from {filename}: {str(e)}")
+
+    def generate_questions(self, pdf_texts, difficulty, num_mcqs, num_answers, max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                           max_chunk_tokens=DEFAULT_CHUNK_TOKENS, use_cache=True, question_bank=None,
+                           token_budget=DEFAULT_TOKEN_BUDGET, over_budget=DOWNSCALE):
         all_questions = {"mcq": [], "short_answer": []}
-        
-        total_pages = sum(pdf["pages"] for pdf in pdf_texts)
-        
-        for pdf in pdf_texts:
-            pdf_ratio = pdf["pages"] / total_pages
-            pdf_mcqs = max(1, round(num_mcqs * pdf_ratio))
-            pdf_answers = max(1, round(num_answers * pdf_ratio))
-            
-            prompt = f"""Generate questions based on the following text with:
-                    - {pdf_mcqs} Multiple Choice Questions (MCQs)
-                    - {pdf_answers} Short Answer Questions
-                    All questions should be {difficulty} level.
-                    Format the response as a JSON string with the following structure:
-                    {{
-                        "mcq": [
-                            {{
-                                "question": "question text",
-                                "options": ["A) option1", "B) option2", "C) option3", "D) option4"],
-                                "correct_answer": "A"
-                            }}
-                        ],
-                        "short_answer": [
-                            {{
-                                "question": "question text",
-                                "answer": "brief answer (2-3 sentences)"
-                            }}
-                        ]
-                    }}
-                    Source: {pdf['filename']}"""
-            
-            response = self.model.generate_content(pdf["text"] + "\n" + prompt)
-            questions = self._parse_response(response.text)
-            
-            if questions:
+        with timed("generate_questions", files=len(pdf_texts)) as stage:
+            for questions in self.iter_questions(pdf_texts, difficulty, num_mcqs, num_answers, max_concurrency,
+                                                 max_chunk_tokens, use_cache, question_bank, ordered=True,
+                                                 token_budget=token_budget, over_budget=over_budget):
+                all_questions["mcq"].extend(questions["mcq"])
+                all_questions["short_answer"].extend(questions["short_answer"])
+            stage["questions"] = len(all_questions["mcq"]) + len(all_questions["short_answer"])
+        return all_questions
+
+    def iter_questions(self, pdf_texts, difficulty, num_mcqs, num_answers, max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                       max_chunk_tokens=DEFAULT_CHUNK_TOKENS, use_cache=True, question_bank=None, ordered=False,
+                       token_budget=DEFAULT_TOKEN_BUDGET, over_budget=DOWNSCALE, plan=None):
+        """Yield batches of new questions, in the ``generate_questions`` format, as each chunk finishes.
+
+        Batches arrive in completion order unless ``ordered`` is set, in which
+        case they follow upload and page order. Every yielded question is new:
+        exact repeats and, with a ``question_bank``, near-duplicates are dropped.
+        The counts are split exactly over the documents by ``plan_generation``
+        (or the ``plan`` given), which enforces ``token_budget`` before any call.
+        """
+        if plan is None:
+            plan = plan_generation(pdf_texts, num_mcqs, num_answers, max_chunk_tokens, token_budget, over_budget)
+        pdf_texts = plan.pdf_texts
+        tokens_left = token_budget - plan.total_tokens if token_budget else None
+
+        accepted = {"mcq": [], "short_answer": []}
+        accepted_index = question_bank.new_index() if question_bank is not None else None
+        seen = []
+
+        def accept(questions):
+            # Only incoming questions are checked, against the bank and what this run already took;
+            # the bank can grow from other sessions meanwhile, and accepted questions must stay accepted
+            new = {}
+            for q_type in ("mcq", "short_answer"):
+                new[q_type] = dedupe_questions(accepted[q_type] + questions[q_type])[len(accepted[q_type]):]
+                if question_bank is not None:
+                    new[q_type] = question_bank.filter_new(new[q_type], accepted_index)
+                accepted[q_type].extend(new[q_type])
+            seen.extend(questions["mcq"] + questions["short_answer"])
+            return new
+
+        for questions in self._iter_round(plan.requests, difficulty, max_concurrency, use_cache, ordered=ordered):
+            new = accept(questions)
+            if new["mcq"] or new["short_answer"]:
+                yield new
+        if question_bank is None:
+            return
+
+        # Near-copies of banked questions were dropped; ask again for just the shortfall
+        for _ in range(MAX_TOP_UP_ROUNDS):
+            missing_mcqs = max(0, num_mcqs - len(accepted["mcq"]))
+            missing_answers = max(0, num_answers - len(accepted["short_answer"]))
+            if not missing_mcqs and not missing_answers:
+                break
+            requests = plan_requests(pdf_texts, split_counts(missing_mcqs, missing_answers,
+                                                             [text_weight(pdf) for pdf in pdf_texts]), max_chunk_tokens)
+            if tokens_left is not None:
+                needed = sum(sum(estimate_request_tokens(chunk, mcqs, answers)) for _, chunk, mcqs, answers in requests)
+                if needed > tokens_left:
+                    self.notify("warning", "Stopped replacing repeated questions to stay within the token budget.")
+                    break
+                tokens_left -= needed
+            for questions in self._iter_round(requests, difficulty, max_concurrency, use_cache,
+                                              avoid=[q["question"] for q in seen], ordered=ordered):
+                new = accept(questions)
+                if new["mcq"] or new["short_answer"]:
+                    yield new
+
+        question_bank.add(accepted["mcq"] + accepted["short_answer"])
+
+    def _iter_round(self, requests, difficulty, max_concurrency, use_cache, avoid=(), ordered=False):
+        # Calls overlap in worker threads; notify() output stays on the consuming thread
+        with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(requests) or 1))) as executor:
+            futures = {executor.submit(self._generate_chunk, pdf, chunk, difficulty, mcqs, answers, avoid, use_cache): pdf
+                       for pdf, chunk, mcqs, answers in requests}
+
+            for future in (futures if ordered else as_completed(futures)):
+                pdf = futures[future]
+                try:
+                    questions, dropped = future.result()
+                except Exception as e:
+                    self.notify("error", f"Error generating questions for {pdf['filename']}: {str(e)}")
+                    continue
+
+                if dropped:
+                    self.notify("warning", f"Discarded {dropped} malformed question(s) from {pdf['filename']}")
                 for q in questions["mcq"]:
                     q["source"] = pdf["filename"]
                 for q in questions["short_answer"]:
                     q["source"] = pdf["filename"]
-                
-                all_questions["mcq"].extend(questions["mcq"])
-                all_questions["short_answer"].extend(questions["short_answer"])
-        
-        return all_questions
-    
-    def _parse_response(self, response_text):
-        try:
-            cleaned_text = response_text.strip()
-            if cleaned_text.startswith("```json"):
-                cleaned_text = cleaned_text[7:-3]
-            return json.loads(cleaned_text)
-        except json.JSONDecodeError as e:
-            st.error(f"Error parsing response: {str(e)}")
-            return None
-
-def create_pdf(questions):
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_font("Arial", "B", 14)
-    
-    # Add MCQs
-    pdf.cell(0, 10, "Multiple Choice Questions", ln=True)
-    pdf.set_font("Arial", size=12)
-    
-    for i, q in enumerate(questions['mcq'], 1):
-        pdf.multi_cell(0, 10, f"{i}. {q['question']} (Source: {q['source']})")
-        for option in q['options']:
-            pdf.multi_cell(0, 10, f"   {option}")
-        pdf.ln(5)
-    
-    # Add Short Answer Questions
-    pdf.set_font("Arial", "B", 14)
-    pdf.cell(0, 10, "Short Answer Questions", ln=True)
-    pdf.set_font("Arial", size=12)
-    
-    for i, q in enumerate(questions['short_answer'], 1):
-        pdf.multi_cell(0, 10, f"{i}. {q['question']} (Source: {q['source']})")
-        pdf.ln(5)
-    
-    return pdf.output(dest='S').encode('latin-1')
+                if questions["mcq"] or questions["short_answer"]:
+                    yield questions
+
+    def _generate_chunk(self, pdf, chunk, difficulty, num_mcqs, num_answers, avoid=(), use_cache=True):
+        # Valid items are kept; only the shortfall is asked for again
+        questions = {"mcq": [], "short_answer": []}
+        dropped = 0
+        missing_mcqs, missing_answers = num_mcqs, num_answers
+        for attempt in range(MAX_PARSE_RETRIES + 1):
+            with timed("build_prompt"):
+                prompt = chunk + "\n" + self._build_prompt(pdf, difficulty, missing_mcqs, missing_answers, avoid)
+            try:
+                response_text = self._generate_content(prompt, use_cache and attempt == 0)
+            except Exception:
+                # A failed follow-up must not throw away the items already salvaged
+                if attempt == 0:
+                    raise
+                break
+            with timed("parse_response"):
+                parsed, invalid = parse_questions(response_text)
+            dropped += invalid
+            questions["mcq"].extend(parsed["mcq"][:missing_mcqs])
+            questions["short_answer"].extend(parsed["short_answer"][:missing_answers])
+            missing_mcqs = num_mcqs - len(questions["mcq"])
+            missing_answers = num_answers - len(questions["short_answer"])
+            if not missing_mcqs and not missing_answers:
+                break
+        return questions, dropped
+
+    def _generate_content(self, prompt, use_cache=True):
+        with timed("generate_content"):
+            return cached_generate(self.model, prompt, self.response_cache, use_cache, generation_config=RESPONSE_CONFIG)
+
+    def _build_prompt(self, pdf, difficulty, num_mcqs, num_answers, avoid=()):
+        if avoid:
+            avoided = "\n".join(f"- {question}" for question in list(avoid)[-MAX_AVOIDED_QUESTIONS:])
+            avoid_note = f"\nDo not repeat or reword any of these existing questions:\n{avoided}\n"
+        else:
+            avoid_note = ""
+        return f"""Generate questions based on the following text with:
+                - {num_mcqs} Multiple Choice Questions (MCQs)
+                - {num_answers} Short Answer Questions
+                All questions should be {difficulty} level.
+                Format the response as a JSON string with the following structure:
+                {{
+                    "mcq": [
+                        {{
+                            "question": "question text",
+                            "options": ["A) option1", "B) option2", "C) option3", "D) option4"],
+                            "correct_answer": "A"
+                        }}
+                    ],
+                    "short_answer": [
+                        {{
+                            "question": "question text",
+                            "answer": "brief answer (2-3 sentences)"
+                        }}
+                    ]
+                }}
+                Source: {pdf['filename']}{avoid_note}"""
 
+def create_pdf(questions, answer_key=False):
+    with timed("create_pdf", questions=len(questions['mcq']) + len(questions['short_answer'])):
+        return render_pdf(questions, answer_key=answer_key)
@@ -0,0 +1,98 @@
+import json
+import re
+
+OPTION_LETTERS = "ABCD"
+RESPONSE_CONFIG = {"response_mime_type": "application/json"}
+
+_decoder = json.JSONDecoder()
+_OPENING_RE = re.compile(r"[\{\[]")
+
+
+def strip_option_label(option):
+    return re.sub(r"^\s*\(?[A-Da-d][\).:]\s*", "", option).strip()
+
+
+def validate_mcq(item):
+    """A cleaned copy of an MCQ item, or ``None`` if it cannot be used."""
+    if not isinstance(item, dict):
+        return None
+    question = item.get("question")
+    options = item.get("options")
+    answer = item.get("correct_answer")
+    if not isinstance(question, str) or not question.strip():
+        return None
+    if not isinstance(options, list) or len(options) != len(OPTION_LETTERS):
+        return None
+    if not all(isinstance(option, str) and strip_option_label(option) for option in options):
+        return None
+    match = re.match(r"\s*\(?([A-Da-d])\b", answer) if isinstance(answer, str) else None
+    if not match:
+        return None
+    return {
+        **item,
+        "question": question.strip(),
+        "options": [f"{letter}) {strip_option_label(option)}" for letter, option in zip(OPTION_LETTERS, options)],
+        "correct_answer": match.group(1).upper(),
+    }
+
+
+def validate_short_answer(item):
+    if not isinstance(item, dict):
+        return None
+    question = item.get("question")
+    answer = item.get("answer")
+    if not isinstance(question, str) or not question.strip() or not isinstance(answer, str) or not answer.strip():
+        return None
+    return {**item, "question": question.strip(), "answer": answer.strip()}
+
+
+def _json_values(text):
+    # Every JSON object or array that decodes cleanly, scanning left to right
+    position = 0
+    while True:
+        match = _OPENING_RE.search(text, position)
+        if not match:
+            return
+        try:
+            value, end = _decoder.raw_decode(text, match.start())
+        except json.JSONDecodeError:
+            position = match.start() + 1
+            continue
+        yield value
+        position = end
+
+
+def parse_questions(response_text):
+    """Parse a model response into ``{"mcq": [...], "short_answer": [...]}``.
+
+    Tolerates code fences and prose around the JSON. Items that fail
+    validation are dropped and counted. If the whole document does not parse
+    (for example, a truncated response), every complete item object found in
+    the text is salvaged instead. Returns ``(questions, dropped)``.
+    """
+    questions = {"mcq": [], "short_answer": []}
+    dropped = 0
+    text = re.sub(r"```(?:json)?", "", response_text or "")
+
+    document = next((value for value in _json_values(text)
+                     if isinstance(value, dict) and ("mcq" in value or "short_answer" in value)), None)
+    if document is not None:
+        candidates = [("mcq", item) for item in document.get("mcq") or []]
+        candidates += [("short_answer", item) for item in document.get("short_answer") or []]
+    else:
+        candidates = []
+        for start in (m.start() for m in re.finditer(r"\{", text)):
+            try:
+                item, _ = _decoder.raw_decode(text, start)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(item, dict) and "question" in item:
+                candidates.append(("mcq" if "options" in item else "short_answer", item))
+
+    for q_type, item in candidates:
+        valid = validate_mcq(item) if q_type == "mcq" else validate_short_answer(item)
+        if valid is None:
+            dropped += 1
+        else:
+            questions[q_type].append(valid)
+    return questions, dropped
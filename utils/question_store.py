@@ -0,0 +1,130 @@
+import copy
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+
+DEFAULT_STORE_PATH = os.path.join(".cache", "questions.sqlite3")
+QUESTION_TYPES = ("mcq", "short_answer")
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+class QuestionStore:
+    """Question sets in SQLite, one set per session or job.
+
+    Saving a set replaces it in a single transaction, so readers never see a
+    half-written test. Loaded sets are kept in memory and re-read only when
+    the set's version changes; callers always get their own copy.
+    """
+
+    def __init__(self, path=DEFAULT_STORE_PATH):
+        self.path = path
+        self._cache = {}
+        self._cache_lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS question_sets (
+                    set_id TEXT PRIMARY KEY,
+                    version INTEGER NOT NULL,
+                    updated REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS questions (
+                    id INTEGER PRIMARY KEY,
+                    set_id TEXT NOT NULL REFERENCES question_sets (set_id),
+                    position INTEGER NOT NULL,
+                    type TEXT NOT NULL,
+                    source TEXT,
+                    difficulty TEXT,
+                    payload TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_questions_set ON questions (set_id, type, position);
+                CREATE INDEX IF NOT EXISTS idx_questions_source ON questions (source);
+                CREATE INDEX IF NOT EXISTS idx_questions_difficulty ON questions (difficulty);
+                CREATE INDEX IF NOT EXISTS idx_questions_type ON questions (type);
+            """)
+
+    def _connect(self):
+        return closing(sqlite3.connect(self.path, timeout=30, isolation_level=None))
+
+    def save_set(self, set_id, questions, difficulty=None):
+        rows = [
+            (set_id, position, q_type, q.get("source"), difficulty, json.dumps(q))
+            for q_type in QUESTION_TYPES
+            for position, q in enumerate(questions.get(q_type, []))
+        ]
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT version FROM question_sets WHERE set_id = ?", (set_id,)).fetchone()
+                version = row[0] + 1 if row else 1
+                conn.execute("INSERT OR REPLACE INTO question_sets (set_id, version, updated) VALUES (?, ?, ?)",
+                             (set_id, version, time.time()))
+                conn.execute("DELETE FROM questions WHERE set_id = ?", (set_id,))
+                conn.executemany(
+                    "INSERT INTO questions (set_id, position, type, source, difficulty, payload) VALUES (?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        with self._cache_lock:
+            self._cache[set_id] = (version, copy.deepcopy(questions))
+
+    def load_set(self, set_id):
+        with self._connect() as conn:
+            row = conn.execute("SELECT version FROM question_sets WHERE set_id = ?", (set_id,)).fetchone()
+            if not row:
+                return None
+            with self._cache_lock:
+                cached = self._cache.get(set_id)
+            if cached and cached[0] == row[0]:
+                return copy.deepcopy(cached[1])
+
+            questions = {q_type: [] for q_type in QUESTION_TYPES}
+            for q_type, payload in conn.execute(
+                "SELECT type, payload FROM questions WHERE set_id = ? ORDER BY type, position", (set_id,)
+            ):
+                questions[q_type].append(json.loads(payload))
+        with self._cache_lock:
+            self._cache[set_id] = (row[0], copy.deepcopy(questions))
+        return questions
+
+    def find(self, source=None, difficulty=None, q_type=None, limit=100):
+        clauses, params = [], []
+        for column, value in (("source", source), ("difficulty", difficulty), ("type", q_type)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._connect() as conn:
+            return [
+                {**json.loads(payload), "type": row_type}
+                for row_type, payload in conn.execute(
+                    f"SELECT type, payload FROM questions {where} ORDER BY id DESC LIMIT ?", (*params, limit)
+                )
+            ]
+
+    def delete_set(self, set_id):
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM questions WHERE set_id = ?", (set_id,))
+            conn.execute("DELETE FROM question_sets WHERE set_id = ?", (set_id,))
+            conn.execute("COMMIT")
+        with self._cache_lock:
+            self._cache.pop(set_id, None)
+
+
+def get_question_store():
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = QuestionStore()
+        return _default_store
@@ -0,0 +1,66 @@
+import hashlib
+import json
+import os
+import threading
+from utils.disk_cache import DiskCache
+from utils.metrics import get_metrics
+
+DEFAULT_CACHE_PATH = os.path.join(".cache", "responses.sqlite3")
+DEFAULT_MAX_BYTES = 128 * 1024 * 1024
+DEFAULT_TTL = 7 * 24 * 60 * 60
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def prompt_key(model_name, prompt, generation_config=None):
+    # Whitespace differences (prompt indentation, trailing newlines) should not split the cache
+    normalized = " ".join(prompt.split())
+    config = json.dumps(generation_config, sort_keys=True) if generation_config else ""
+    return hashlib.sha256(f"{model_name}\0{config}\0{normalized}".encode("utf-8")).hexdigest()
+
+
+class ResponseCache(DiskCache):
+    """Gemini response text keyed on model name plus a normalized prompt hash."""
+
+    table = "responses"
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES, ttl=DEFAULT_TTL):
+        super().__init__(path, max_bytes, ttl)
+
+    def get(self, model_name, prompt, generation_config=None):
+        return self.get_key(prompt_key(model_name, prompt, generation_config))
+
+    def put(self, model_name, prompt, response_text, generation_config=None):
+        self.put_key(prompt_key(model_name, prompt, generation_config), response_text)
+
+
+def get_response_cache():
+    """The process-wide cache shared by question generation and grading."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ResponseCache()
+        return _default_cache
+
+
+def cached_generate(model, prompt, cache=None, use_cache=True, generation_config=None):
+    """``model.generate_content(prompt).text``, served from ``cache`` when possible.
+
+    Pass ``use_cache=False`` to force a fresh call; the new response still
+    replaces the cached one.
+    """
+    cache = cache or get_response_cache()
+    model_name = getattr(model, "model_name", "")
+    if use_cache:
+        cached = cache.get(model_name, prompt, generation_config)
+        if cached is not None:
+            return cached
+    if generation_config:
+        response = model.generate_content(prompt, generation_config=generation_config)
+    else:
+        response = model.generate_content(prompt)
+    get_metrics().record_usage(response, model_name)
+    response_text = response.text
+    cache.put(model_name, prompt, response_text, generation_config)
+    return response_text
@@ -0,0 +1,161 @@
+import re
+import numpy as np
+from utils.chunking import CHARS_PER_TOKEN, estimate_tokens
+
+# BM25 saturation and length normalisation
+K1 = 1.5
+B = 0.75
+# How many of the document's most characteristic terms act as the implicit query
+QUERY_TERMS = 64
+# Passages with heading-like lines usually open a topic
+HEADING_BOOST = 1.25
+# Each time a term is covered by a selected passage its weight is multiplied by this
+COVERAGE_DECAY = 0.5
+
+WORD_RE = re.compile(r"[a-z][a-z0-9\-]{2,}")
+HEADING_RE = re.compile(r"^\s*(?:\d+(?:\.\d+)*\.?\s+[A-Z].{0,60}|[A-Z][A-Z0-9 ,:\-]{3,60}|(?i:chapter)\s+\d+.*)\s*$",
+                        re.MULTILINE)
+STOPWORDS = frozenset("""
+about above after again against all also and any are because been before being below between both but can
+could did does doing down during each few for from further had has have having her here hers him his how
+into its itself just more most not now off once only other our ours out over own same she should some such
+than that the their theirs them then there these they this those through too under until upon very was were
+what when where which while who whom why will with would you your yours
+""".split())
+
+
+def _tokenize(text):
+    return [word for word in WORD_RE.findall(text.lower()) if word not in STOPWORDS]
+
+
+def _has_heading(text):
+    return any(len(match.split()) <= 10 for match in HEADING_RE.findall(text))
+
+
+class SalienceIndex:
+    """BM25-style salience scores for the passages of one document.
+
+    There is no user query, so the document's own highest TF-IDF terms are
+    used as one. Term counts are kept as flat (passage, term) pair arrays
+    rather than a dense matrix, which keeps a 1,000-page index small.
+    """
+
+    def __init__(self, passages):
+        self.passages = list(passages)
+        vocabulary = {}
+        passage_ids = []
+        term_ids = []
+        for passage_id, passage in enumerate(self.passages):
+            for word in _tokenize(passage):
+                passage_ids.append(passage_id)
+                term_ids.append(vocabulary.setdefault(word, len(vocabulary)))
+
+        num_passages = len(self.passages)
+        num_terms = len(vocabulary)
+        self.vocabulary = vocabulary
+        self.lengths = np.bincount(np.asarray(passage_ids, dtype=np.int64), minlength=num_passages).astype(float)
+        self.headings = np.array([_has_heading(passage) for passage in self.passages], dtype=bool)
+
+        if not num_terms:
+            self.pair_passages = np.zeros(0, dtype=np.int64)
+            self.pair_terms = np.zeros(0, dtype=np.int64)
+            self.pair_scores = np.zeros(0)
+            return
+
+        pair_keys, tf = np.unique(np.asarray(passage_ids, dtype=np.int64) * num_terms + np.asarray(term_ids),
+                                  return_counts=True)
+        self.pair_passages = pair_keys // num_terms
+        self.pair_terms = pair_keys % num_terms
+
+        df = np.bincount(self.pair_terms, minlength=num_terms)
+        idf = np.log(1 + (num_passages - df + 0.5) / (df + 0.5))
+        corpus_tf = np.bincount(self.pair_terms, weights=tf, minlength=num_terms)
+
+        query_weights = np.zeros(num_terms)
+        top_terms = np.argsort(-(corpus_tf * idf))[:QUERY_TERMS]
+        query_weights[top_terms] = idf[top_terms]
+
+        avg_length = self.lengths.mean() or 1.0
+        norm = K1 * (1 - B + B * self.lengths[self.pair_passages] / avg_length)
+        self.pair_scores = query_weights[self.pair_terms] * tf * (K1 + 1) / (tf + norm)
+
+    def scores(self, coverage=None):
+        weights = self.pair_scores
+        if coverage is not None:
+            weights = weights * COVERAGE_DECAY ** coverage[self.pair_terms]
+        scores = np.bincount(self.pair_passages, weights=weights, minlength=len(self.passages))
+        return np.where(self.headings, scores * HEADING_BOOST, scores)
+
+    def select(self, token_budget, max_passages=None):
+        """Indices of the passages to keep, in document order, within ``token_budget``.
+
+        Passages are picked greedily by score; terms already covered count for
+        less each round so the selection spreads over distinct topics.
+        """
+        coverage = np.zeros(len(self.vocabulary))
+        available = np.ones(len(self.passages), dtype=bool)
+        # Each kept passage is followed by a newline when the selection is joined back together
+        tokens = np.array([estimate_tokens(passage + "\n") for passage in self.passages])
+        selected = []
+        remaining = token_budget
+        while available.any() and (max_passages is None or len(selected) < max_passages):
+            scores = np.where(available & (tokens <= remaining), self.scores(coverage), -np.inf)
+            best = int(np.argmax(scores))
+            if scores[best] == -np.inf:
+                break
+            selected.append(best)
+            available[best] = False
+            remaining -= tokens[best]
+            coverage[self.pair_terms[self.pair_passages == best]] += 1
+        return sorted(selected)
+
+
+def _split_page(page_text, max_chars):
+    # Line-aligned pieces of at most max_chars; a single longer line is cut
+    pieces = []
+    current = ""
+    for line in page_text.split("\n"):
+        while len(line) > max_chars:
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(line[:max_chars])
+            line = line[max_chars:]
+        if current and len(current) + 1 + len(line) > max_chars:
+            pieces.append(current)
+            current = ""
+        current = f"{current}\n{line}" if current else line
+    if current.strip():
+        pieces.append(current)
+    return [piece for piece in pieces if piece.strip()]
+
+
+def select_salient_pages(pdf_texts, token_budget):
+    """Trim each extracted document down to its most salient pages, within ``token_budget`` tokens.
+
+    Returns new records in the ``extract_text_from_pdfs`` format, so the
+    result can go straight into ``generate_questions``. ``pages`` and
+    ``text_chars`` keep the original size, so question counts are still split
+    by how much the whole document covers. Pages larger than the budget are
+    split into passages first, so the kept text always fits.
+    """
+    # One character of the budget is left for the newline after each passage
+    max_chars = max(1, token_budget * CHARS_PER_TOKEN - 1)
+    focused = []
+    for pdf in pdf_texts:
+        page_texts = pdf.get("page_texts", [pdf["text"]])
+        if estimate_tokens(pdf["text"]) <= token_budget:
+            focused.append(pdf)
+            continue
+        passages = []
+        page_numbers = []
+        for page_number, page_text in enumerate(page_texts, 1):
+            pieces = [page_text] if len(page_text) <= max_chars else _split_page(page_text, max_chars)
+            passages.extend(pieces)
+            page_numbers.extend([page_number] * len(pieces))
+        keep = SalienceIndex(passages).select(token_budget)
+        kept_texts = [passages[i] for i in keep]
+        focused.append({**pdf, "text": "\n".join(kept_texts) + "\n", "page_texts": kept_texts,
+                        "selected_pages": sorted({page_numbers[i] for i in keep}),
+                        "text_chars": len(pdf["text"].strip())})
+    return focused
@@ -0,0 +1,61 @@
+"""Check that the app modules import within a cold-start budget.
+
+    python -m utils.startup_benchmark --budget 1.5
+
+Each module is imported in a fresh interpreter, so nothing is already cached
+in ``sys.modules``. The run fails if a module takes longer than the budget or
+pulls in a heavy dependency that should only load when it is first used.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+MODULES = ["Home", "utils.question_generator", "utils.test_utils"]
+# Loaded on first use (a PDF upload, a Gemini call, a PDF download), never at import
+LAZY_DEPENDENCIES = ["google.generativeai", "pdfplumber", "PyPDF2", "fpdf", "dotenv"]
+DEFAULT_BUDGET = 1.5
+DEFAULT_RUNS = 3
+
+_PROBE = """
+import importlib, json, sys, time
+start = time.perf_counter()
+importlib.import_module(sys.argv[1])
+elapsed = time.perf_counter() - start
+print(json.dumps({"seconds": elapsed, "loaded": [name for name in sys.argv[2:] if name in sys.modules]}))
+"""
+
+
+def measure(module, runs=DEFAULT_RUNS):
+    """Best import time over ``runs`` fresh interpreters, and the lazy dependencies it loaded."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    best, loaded = None, set()
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", _PROBE, module, *LAZY_DEPENDENCIES], cwd=root,
+                                capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        best = result["seconds"] if best is None else min(best, result["seconds"])
+        loaded.update(result["loaded"])
+    return best, sorted(loaded)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fail if the app modules import slower than the budget.")
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET, help="seconds allowed per module")
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS, help="fresh interpreters per module; the best run counts")
+    parser.add_argument("modules", nargs="*", default=MODULES)
+    args = parser.parse_args(argv)
+
+    failed = False
+    for module in args.modules:
+        seconds, loaded = measure(module, args.runs)
+        ok = seconds <= args.budget and not loaded
+        failed = failed or not ok
+        note = f"  eager: {', '.join(loaded)}" if loaded else ""
+        print(f"{'ok  ' if ok else 'FAIL'} {module:<28} {seconds:6.3f}s{note}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
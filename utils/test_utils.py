@@ -1,28 +1,48 @@
 import json
 import streamlit as st
-import google.generativeai as genai
 import os
 import re
-from dotenv import load_dotenv
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from utils.config import get_api_key
+from utils.llm_gateway import get_gateway
+from utils.metrics import timed
+from utils.question_store import get_question_store
+from utils.response_cache import cached_generate
 
-load_dotenv()
+# Extra batch requests for answers whose grade was missing or malformed
+BATCH_GRADING_RETRIES = 2
+# Progressive grading: short answers per request, and requests in flight at once
+GRADING_BATCH_SIZE = 4
+GRADING_WORKERS = 4
 
-GOOGLE_API_KEY = st.secrets['secret_key']
+def session_question_set_id():
+    # Each browser session gets its own question set, shared by both pages
+    if "question_set_id" not in st.session_state:
+        st.session_state["question_set_id"] = uuid.uuid4().hex
+    return st.session_state["question_set_id"]
+
+def save_questions(questions, difficulty=None):
+    get_question_store().save_set(session_question_set_id(), questions, difficulty)
 
 def load_questions():
-    try:
-        with open('generated_questions.json', 'r') as f:
-            return json.load(f)
-    except FileNotFoundError:
+    questions = get_question_store().load_set(session_question_set_id())
+    if questions is None:
         st.error("No generated questions found. Please generate questions first.")
-        return None
+    return questions
 
-def compare_answers(question, correct_answer, user_answer):
-    api_key = GOOGLE_API_KEY
+def _grading_model():
+    api_key = get_api_key()
     if not api_key:
         raise ValueError("Google API Key not found. Please set the GOOGLE_API_KEY environment variable.")
-    genai.configure(api_key=api_key)
-    model = genai.GenerativeModel('gemini-1.5-flash')
+    return get_gateway(api_key)
+
+def compare_answers(question, correct_answer, user_answer, use_cache=True):
+    with timed("compare_answers"):
+        return _compare_answers(question, correct_answer, user_answer, use_cache)
+
+def _compare_answers(question, correct_answer, user_answer, use_cache):
+    model = _grading_model()
 
     prompt = f"""
     Question: {question}
@@ -45,8 +65,7 @@ def compare_answers(question, correct_answer, user_answer):
     """
     
     try:
-        response = model.generate_content(prompt)
-        response_text = response.text.strip()
+        response_text = cached_generate(model, prompt, use_cache=use_cache).strip()
         
         # Parse the response text
         score_match = re.search(r'Score:\s*(\d+)', response_text)
@@ -55,7 +74,7 @@ def compare_answers(question, correct_answer, user_answer):
         suggestions_match = re.search(r'Suggestions:\s*(.*?)(?:\n|$)', response_text, re.DOTALL)
 
         result = {
-            "score": int(score_match.group(1)) if score_match else 5,
+            "score": int(score_match.group(1)) if score_match else None,
             "feedback": {
                 "correct": correct_match.group(1).strip() if correct_match else "Unable to determine specific correct aspects.",
                 "incorrect": incorrect_match.group(1).strip() if incorrect_match else "Unable to determine specific incorrect aspects.",
@@ -66,15 +85,197 @@ def compare_answers(question, correct_answer, user_answer):
         return result
     except Exception as e:
         st.error(f"An error occurred while evaluating the answer: {str(e)}")
-        return fallback_response()
+        return ungraded_response()
+
+def _batch_grading_prompt(items):
+    answers = json.dumps([
+        {"id": i, "question": question, "correct_answer": correct_answer, "user_answer": user_answer or ""}
+        for i, (question, correct_answer, user_answer) in items
+    ], indent=2)
+    return f"""
+    Grade each of the following answers against its correct answer.
+    {answers}
+
+    For every item provide:
+    1. A score out of 10 (an empty user answer always scores 0)
+    2. Feedback on what the user got right
+    3. Feedback on what the user got wrong or missed
+    4. Suggestions for improvement
+
+    Respond with only a JSON array containing one object per item, in this format:
+    [{{"id": 0, "score": 7, "correct": "...", "incorrect": "...", "suggestions": "..."}}]
+    """
+
+def _integer_score(score):
+    # Whole numbers only: 7.9 is not silently turned into 7, and true/false (bools are ints) is not a score
+    if isinstance(score, str) and score.strip().isdigit():
+        return int(score)
+    if isinstance(score, float) and score.is_integer():
+        return int(score)
+    if isinstance(score, int) and not isinstance(score, bool):
+        return score
+    return None
 
-def fallback_response():
+def _parse_batch_grades(response_text, expected_ids):
+    try:
+        cleaned_text = response_text.strip()
+        if cleaned_text.startswith("```"):
+            cleaned_text = cleaned_text.strip("`").removeprefix("json")
+        grades = json.loads(cleaned_text)
+    except json.JSONDecodeError:
+        return {}
+    if isinstance(grades, dict):
+        grades = grades.get("results", [])
+
+    # Models sometimes send ids back as strings
+    ids = {str(i): i for i in expected_ids}
+    results = {}
+    for grade in grades if isinstance(grades, list) else []:
+        if not isinstance(grade, dict) or str(grade.get("id")) not in ids:
+            continue
+        score = _integer_score(grade.get("score"))
+        if score is None:
+            continue
+        if not 0 <= score <= 10 or not all(isinstance(grade.get(key), str) for key in ("correct", "incorrect", "suggestions")):
+            continue
+        results[ids[str(grade["id"])]] = {
+            "score": score,
+            "feedback": {
+                "correct": grade["correct"].strip(),
+                "incorrect": grade["incorrect"].strip(),
+                "suggestions": grade["suggestions"].strip()
+            }
+        }
+    return results
+
+def _grade_batch(items, use_cache=True, max_retries=BATCH_GRADING_RETRIES):
+    # No st.* calls in here: it also runs on grading worker threads
+    with timed("grade_batch", answers=len(items)):
+        return _grade_batch_once(items, use_cache, max_retries)
+
+def _grade_batch_once(items, use_cache, max_retries):
+    model = _grading_model()
+    pending = list(enumerate(items))
+    results = {}
+    error = None
+    for attempt in range(max_retries + 1):
+        try:
+            response_text = cached_generate(model, _batch_grading_prompt(pending), use_cache=use_cache and attempt == 0,
+                                            generation_config={"response_mime_type": "application/json"})
+            results.update(_parse_batch_grades(response_text, {i for i, _ in pending}))
+        except Exception as e:
+            error = str(e)
+            break
+        pending = [(i, item) for i, item in pending if i not in results]
+        if not pending:
+            break
+    return results, error
+
+def _report_batch(items, results, error):
+    if error:
+        st.error(f"An error occurred while evaluating the answers: {error}")
+    ungraded = len(items) - len(results)
+    if ungraded:
+        st.warning(f"Could not grade {ungraded} answer(s); they are marked as not graded and left out of the total.")
+
+def ungraded_response():
+    # No score rather than a made-up one, so it never counts towards a total
     return {
-        "score": 5,
+        "score": None,
         "feedback": {
-            "correct": "Unable to determine specific correct aspects.",
-            "incorrect": "Unable to determine specific incorrect aspects.",
+            "correct": "This answer could not be graded.",
+            "incorrect": "This answer could not be graded.",
             "suggestions": "Please review the correct answer and compare it with your response."
         }
     }
 
+
+def _option_letter(option):
+    match = re.match(r'\s*\(?([A-Za-z])[\).:]', option or "")
+    return match.group(1).upper() if match else (option or "").strip().upper()
+
+def _normalize_answer(answer):
+    return " ".join(re.sub(r'[^\w\s]', '', answer or "").lower().split())
+
+def grade_mcq(question, user_answer):
+    correct_letter = _option_letter(question['correct_answer'])
+    correct_option = next((option for option in question['options'] if _option_letter(option) == correct_letter),
+                          question['correct_answer'])
+    if not user_answer:
+        return {
+            "score": 0,
+            "feedback": {
+                "correct": "No answer was selected.",
+                "incorrect": f"The correct answer is {correct_option}.",
+                "suggestions": "Make sure to answer every question before submitting."
+            }
+        }
+    if _option_letter(user_answer) == correct_letter:
+        return {
+            "score": 10,
+            "feedback": {
+                "correct": f"You chose the correct answer: {correct_option}.",
+                "incorrect": "Nothing, well done.",
+                "suggestions": "Keep it up."
+            }
+        }
+    return {
+        "score": 0,
+        "feedback": {
+            "correct": "Nothing, this option is not correct.",
+            "incorrect": f"You chose {user_answer}, but the correct answer is {correct_option}.",
+            "suggestions": "Review the part of the material this question comes from."
+        }
+    }
+
+def grade_short_answer_locally(correct_answer, user_answer):
+    """Score blank and exact-match answers without the model; ``None`` means it needs judgement."""
+    if not _normalize_answer(user_answer):
+        return {
+            "score": 0,
+            "feedback": {
+                "correct": "No answer was provided.",
+                "incorrect": f"The expected answer was: {correct_answer}",
+                "suggestions": "Make sure to answer every question before submitting."
+            }
+        }
+    if _normalize_answer(user_answer) == _normalize_answer(correct_answer):
+        return {
+            "score": 10,
+            "feedback": {
+                "correct": "Your answer matches the expected answer.",
+                "incorrect": "Nothing, well done.",
+                "suggestions": "Keep it up."
+            }
+        }
+    return None
+
+def iter_grades(entries, use_cache=True, batch_size=GRADING_BATCH_SIZE, max_workers=GRADING_WORKERS):
+    """Yield ``(index, result)`` for ``(q_type, question, user_answer)`` entries as soon as each is graded.
+
+    Locally graded answers come first. The rest are split into batches of
+    ``batch_size`` and graded on up to ``max_workers`` threads, in completion order.
+    """
+    remote = []
+    for i, (q_type, question, user_answer) in enumerate(entries):
+        result = grade_mcq(question, user_answer) if q_type == "mcq" else grade_short_answer_locally(question['answer'], user_answer)
+        if result is None:
+            remote.append(i)
+        else:
+            yield i, result
+
+    if not remote:
+        return
+    batch_size = max(1, batch_size)
+    batches = [remote[start:start + batch_size] for start in range(0, len(remote), batch_size)]
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(batches)))) as executor:
+        futures = {}
+        for batch in batches:
+            items = [(entries[i][1]['question'], entries[i][1]['answer'], entries[i][2]) for i in batch]
+            futures[executor.submit(_grade_batch, items, use_cache)] = (batch, items)
+        for future in as_completed(futures):
+            batch, items = futures[future]
+            results, error = future.result()
+            _report_batch(items, results, error)
+            for k, i in enumerate(batch):
+                yield i, results.get(k, ungraded_response())
@@ -0,0 +1,106 @@
+"""Seeded exam variants of a question set, built locally without calling Gemini.
+
+    python -m utils.variants questions.json --count 3 --out variants/ --papers variants.zip
+
+Each variant has its own question order and MCQ option order, and every
+``correct_answer`` letter is remapped to follow its option. Options such as
+"All of the above" keep their question's options in place, as do questions
+with more options than there are letters. The same seed always gives the
+same variants.
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+from utils.question_schema import OPTION_LETTERS, strip_option_label
+
+# Options that point at other options only make sense in their original order
+_POSITIONAL_OPTION_RE = re.compile(r"\b(all|none|both|neither) of the (above|options)\b|\b[A-D] and [A-D]\b", re.IGNORECASE)
+
+
+def variant_label(index):
+    """``A``, ``B``, ... ``Z``, ``AA``, ``AB``, ... for a zero-based index."""
+    label = ""
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        label = chr(ord("A") + remainder) + label
+    return label
+
+
+def _prepare_mcq(q):
+    if len(q["options"]) > len(OPTION_LETTERS):
+        # Cannot be relabelled A-D, so the question is used as it is
+        return q, None, None, True
+    # Labels are stripped once here, not per variant
+    options = [strip_option_label(option) for option in q["options"]]
+    letter = (q.get("correct_answer") or "").strip()[:1].upper()
+    correct = OPTION_LETTERS.index(letter) if letter and letter in OPTION_LETTERS[:len(options)] else None
+    fixed = any(_POSITIONAL_OPTION_RE.search(option) for option in options)
+    return q, options, correct, fixed
+
+
+def _variant(mcqs, short_answers, rng):
+    mcq_order = list(range(len(mcqs)))
+    rng.shuffle(mcq_order)
+    variant = {"mcq": [], "short_answer": []}
+    for index in mcq_order:
+        q, options, correct, fixed = mcqs[index]
+        if options is None:
+            variant["mcq"].append(q)
+            continue
+        order = list(range(len(options)))
+        if not fixed:
+            rng.shuffle(order)
+        shuffled = {**q, "options": [f"{OPTION_LETTERS[i]}) {options[j]}" for i, j in enumerate(order)]}
+        if correct is not None:
+            shuffled["correct_answer"] = OPTION_LETTERS[order.index(correct)]
+        variant["mcq"].append(shuffled)
+    answer_order = list(range(len(short_answers)))
+    rng.shuffle(answer_order)
+    variant["short_answer"] = [short_answers[index] for index in answer_order]
+    return variant
+
+
+def make_variants(questions, count, seed=0):
+    """``count`` shuffled copies of ``questions`` as ``(label, questions)`` pairs, labelled A, B, C..."""
+    mcqs = [_prepare_mcq(q) for q in questions.get("mcq", [])]
+    short_answers = list(questions.get("short_answer", []))
+    # A string seed per variant keeps variant B the same whether 2 or 200 are made
+    return [(variant_label(i), _variant(mcqs, short_answers, random.Random(f"{seed}:{i}"))) for i in range(count)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Make shuffled exam variants of a question set without calling Gemini.")
+    parser.add_argument("source", help="question set in the app's JSON format")
+    parser.add_argument("--count", type=int, default=3, help="number of variants")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="directory for one JSON file per variant")
+    parser.add_argument("--papers", help="also render PDF papers to this directory, or zip if it ends in .zip")
+    parser.add_argument("--answer-key", action="store_true", help="add an answer key page to each paper")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="PDF rendering processes")
+    args = parser.parse_args(argv)
+    if not args.out and not args.papers:
+        parser.error("give --out, --papers or both")
+
+    with open(args.source, encoding="utf-8") as f:
+        questions = json.load(f)
+    stem = os.path.splitext(os.path.basename(args.source))[0]
+    variants = [(f"{stem}-{label}", variant) for label, variant in make_variants(questions, args.count, args.seed)]
+
+    if args.out:
+        os.makedirs(args.out, exist_ok=True)
+        for name, variant in variants:
+            with open(os.path.join(args.out, f"{name}.json"), "w", encoding="utf-8") as f:
+                json.dump(variant, f, indent=2, ensure_ascii=False)
+    if args.papers:
+        from utils.pdf_export import export_papers
+        export_papers(variants, args.papers, args.answer_key, args.workers)
+    print(f"Wrote {len(variants)} variant(s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())